@@ -0,0 +1,60 @@
+"""Save time and archive size of a media-heavy module set per compression policy.
+
+Usage: python benchmarks/bench_compression.py [images] [image_kb]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.archive import CompressionPolicy
+from core.module_set import ModuleSet
+
+def make_module_set(directory, images, image_kb):
+    """Fill directory with a module set whose media is random (incompressible) data."""
+    media_dir = os.path.join(directory, "media")
+    os.makedirs(media_dir)
+    module_set = ModuleSet(temp_dir=directory)
+    for m in range(10):
+        sections = []
+        for t in range(images // 10):
+            name = f"image_{m}_{t}.jpg"
+            with open(os.path.join(media_dir, name), "wb") as f:
+                f.write(os.urandom(image_kb * 1024))
+            sections.append({"type": "image", "imgSrc": name, "caption": "Caption " * 8, "attribution": ""})
+            sections.append({"type": "text", "header": "Header", "content": "Lorem ipsum dolor sit amet. " * 40})
+        module_set.modules.append({"id": str(m), "title": f"Module {m}", "imgSrc": None, "topics": [{"title": "Topic", "sections": sections}]})
+    module_set.media_dir = media_dir
+    return module_set
+
+def main():
+    images = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    image_kb = int(sys.argv[2]) if len(sys.argv) > 2 else 512
+    policies = [
+        ("deflate everything (old)", CompressionPolicy(stored_extensions=())),
+        ("default policy", CompressionPolicy()),
+        ("fast policy", CompressionPolicy.fast()),
+    ]
+
+    work_dir = tempfile.mkdtemp(prefix="modulearn-bench_")
+    try:
+        module_set = make_module_set(os.path.join(work_dir, "set"), images, image_kb)
+        print(f"{images} images x {image_kb} KiB")
+        for label, policy in policies:
+            zip_path = os.path.join(work_dir, "out.zip")
+            module_set.compression = policy
+            module_set.source_entries = {}  # force a full save
+            start = time.perf_counter()
+            module_set.save(zip_path)
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(zip_path) / (1024 * 1024)
+            print(f"{label:<28} {elapsed:7.3f} s {size:9.2f} MiB")
+            os.remove(zip_path)
+    finally:
+        shutil.rmtree(work_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Size and encoding speed of the module JSON export profiles, with round-trip checks.
+
+Every profile's output is parsed back and compared with the model, and the
+stdlib and orjson encodings of the compact profile are checked to be identical.
+
+Usage: python benchmarks/bench_export.py [modules] [topics] [sections]
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.export import ExportProfile, load_orjson
+from core.model import modules_from_json, plain
+
+# Filipino lesson text: mostly ASCII, with the accents, ñ and typography it uses
+WORDS = (
+    "ang mga halaman ay nangangailangan ng tubig at sikat ng araw upang mabuhay "
+    "tinatawag itong “photosynthesis” — ang proseso kung saan gumagawa ng pagkain "
+    "ang dahon Niño Señora kapâ pagbása dalawá tatló ’yan …"
+).split()
+
+def text(words):
+    return " ".join(random.choices(WORDS, k=words))
+
+def make_set(modules, topics, sections):
+    return [{
+        "id": str(m),
+        "title": f"Modyul {m}: {text(4)}",
+        "imgSrc": None,
+        "topics": [{
+            "title": f"Paksa {t}",
+            "sections": [{"type": "text", "header": text(3), "content": text(random.randint(40, 200))} for _ in range(sections)],
+        } for t in range(topics)],
+        "assessment": [{
+            "question": text(12), "choices": {"a": text(3), "b": text(3), "c": text(3), "d": text(3)},
+            "answer": "a", "imgSrc": None, "caption": "", "attribution": "",
+        } for _ in range(10)],
+    } for m in range(modules)]
+
+def check_round_trip(label, profile, modules):
+    for module in modules:
+        data = profile.encode(module)
+        loaded = json.loads(data.decode("utf-8"))
+        if loaded != plain(module):
+            raise AssertionError(f"{label}: module {module['id']} changed in a round trip")
+        if profile.encode(modules_from_json([loaded])[0]) != data:
+            raise AssertionError(f"{label}: module {module['id']} encodes differently after reloading")
+
+def main():
+    modules = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    topics = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    sections = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    orjson = load_orjson()
+    random.seed(0)
+    records = modules_from_json(make_set(modules, topics, sections))
+    profiles = [("pretty", ExportProfile("pretty")), ("compact (json)", ExportProfile("compact", backend="json"))]
+    if orjson is not None:
+        profiles.append(("compact (orjson)", ExportProfile("compact", backend="orjson")))
+    else:
+        print("orjson is not installed, skipping its backend")
+
+    print(f"{modules} modules x {topics} topics x {sections} sections")
+    baseline = None
+    for label, profile in profiles:
+        check_round_trip(label, profile, records)
+        start = time.perf_counter()
+        encoded = [profile.encode(module) for module in records]
+        elapsed = time.perf_counter() - start
+        size = sum(map(len, encoded))
+        deflated = sum(len(zlib.compress(data, 6)) for data in encoded)
+        baseline = baseline or (size, deflated, elapsed)
+        print(f"{label:<18} {size / 2**20:7.2f} MiB ({size / baseline[0]:4.0%})  "
+              f"deflated {deflated / 2**20:6.2f} MiB ({deflated / baseline[1]:4.0%})  "
+              f"{elapsed * 1000:8.1f} ms  {size / 2**20 / elapsed:6.1f} MiB/s")
+
+    if orjson is not None:
+        stdlib, fast = ExportProfile("compact", backend="json"), ExportProfile("compact", backend="orjson")
+        if any(stdlib.encode(module) != fast.encode(module) for module in records):
+            raise AssertionError("json and orjson encode compact modules differently")
+    print("round trips OK")
+
+if __name__ == "__main__":
+    main()
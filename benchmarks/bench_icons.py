@@ -0,0 +1,51 @@
+"""Time and memory of creating delete-button icons per row vs. the shared AssetRegistry.
+
+Usage: python benchmarks/bench_icons.py [rows]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import customtkinter
+from PIL import Image
+
+from ui.assets import DELETE_ICON, AssetRegistry
+
+def resource_path(relative_path):
+    return os.path.join(ROOT, relative_path)
+
+def per_row(rows):
+    """What the editors did before: open and decode the PNG for every row."""
+    images = []
+    for _ in range(rows):
+        img = Image.open(resource_path(DELETE_ICON))
+        img.load()  # Tk decodes it as soon as the button is drawn
+        images.append(customtkinter.CTkImage(light_image=img))
+    return images
+
+def shared(rows):
+    registry = AssetRegistry(resource_path)
+    return [registry.image(DELETE_ICON) for _ in range(rows)]
+
+def measure(label, fn, rows):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(rows)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10} {elapsed * 1000:8.2f} ms {peak / 1024:10.1f} KiB peak")
+    return result
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    print(f"{rows} rows")
+    measure("per row", per_row, rows)
+    measure("shared", shared, rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Speed of core.importer on large generated Markdown and CSV sources.
+
+The imported set is validated and checked to hold every module, section and
+question the sources describe.
+
+Usage: python benchmarks/bench_import.py [questions] [modules] [topics] [sections]
+"""
+import os
+import sys
+import csv
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.importer import plan_import
+from core.module_set import ModuleSet
+from core.search import SearchIndex
+
+WORDS = "ang mga halaman ay nangangailangan ng tubig at sikat araw upang mabuhay dahon ugat".split()
+
+def text(words):
+    return " ".join(random.choices(WORDS, k=words))
+
+def write_markdown(path, modules, topics, sections):
+    # One of each section type in turn
+    blocks = [
+        lambda: f"### {text(3)}\n{text(30)}\n{text(30)}\n\n{text(20)}\n",
+        lambda: "".join(f"- {text(5)}\n" for _ in range(4)),
+        lambda: f"> Trivia: {text(15)}\n",
+        lambda: f"> Remember: {text(15)}\n",
+        lambda: f"Q: {text(8)}?\nA: {text(4)}\n",
+        lambda: f"{text(40)}\n",
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        for m in range(modules):
+            f.write(f"# Modyul {m}\n\n")
+            for t in range(topics):
+                f.write(f"## Paksa {t}\n\n")
+                for s in range(sections):
+                    f.write(blocks[s % len(blocks)]() + "\n")
+
+def write_questions(path, questions, modules):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["module", "question", "a", "b", "c", "d", "answer"])
+        for q in range(questions):
+            choices = [text(2) for _ in range(4)]
+            writer.writerow([f"Modyul {q % modules}", text(12) + "?", *choices, random.choice("abcd")])
+
+def main():
+    questions = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    modules = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    topics = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    sections = int(sys.argv[4]) if len(sys.argv) > 4 else 30
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as source_dir:
+        markdown = os.path.join(source_dir, "lessons.md")
+        bank = os.path.join(source_dir, "questions.csv")
+        write_markdown(markdown, modules, topics, sections)
+        write_questions(bank, questions, modules)
+        print(f"{modules} modules x {topics} topics x {sections} sections "
+              f"({os.path.getsize(markdown) / 2**20:.1f} MiB), "
+              f"{questions} questions ({os.path.getsize(bank) / 2**20:.1f} MiB)")
+
+        module_set = ModuleSet()
+        module_set.start_journal()
+        index = SearchIndex(module_set.modules)
+        index.build()
+        module_set.listeners.append(index.update)
+        try:
+            for label, paths in (("markdown", [markdown]), ("csv", [bank])):
+                start = time.perf_counter()
+                plan = plan_import(paths, module_set.import_media)
+                read = time.perf_counter() - start
+                # Applied like the GUI does: one journaled change the search index follows
+                start = time.perf_counter()
+                module_set.apply(plan.ops(module_set.modules))
+                applied = time.perf_counter() - start
+                print(f"{label:<9} read {read * 1000:7.1f} ms  apply {applied * 1000:7.1f} ms")
+
+            if len(module_set.modules) != modules:
+                raise AssertionError(f"expected {modules} modules, got {len(module_set.modules)}")
+            section_count = sum(len(topic.sections) for module in module_set.modules for topic in module.topics)
+            if section_count != modules * topics * sections:
+                raise AssertionError(f"expected {modules * topics * sections} sections, got {section_count}")
+            if sum(len(module.assessment) for module in module_set.modules) != questions:
+                raise AssertionError("questions went missing")
+            problems = module_set.validate()
+            if problems:
+                raise AssertionError(f"imported set has problems: {problems[:3]}")
+        finally:
+            module_set.cleanup()
+    print("import OK")
+
+if __name__ == "__main__":
+    main()
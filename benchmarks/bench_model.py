@@ -0,0 +1,82 @@
+"""Memory and JSON speed of the core.model records against the plain dicts they replaced.
+
+Usage: python benchmarks/bench_model.py [modules] [topics] [sections]
+"""
+import os
+import sys
+import json
+import time
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.model import modules_from_json, plain
+
+SECTION_TYPES = ["text", "list", "image", "trivia", "remember", "active-recall"]
+
+def make_section(section_type, i):
+    """A section as show_topic_editor used to build it, with some text filled in."""
+    text = f"Section {i} " + "lorem ipsum " * random.randint(2, 20)
+    if section_type == "image":
+        return {"type": "image", "imgSrc": f"{i:016x}.webp", "caption": text[:40], "attribution": ""}
+    if section_type == "active-recall":
+        return {"type": "active-recall", "question": text, "answer": text[:20]}
+    if section_type == "list":
+        return {"type": "list", "category": "unordered", "hasHeader": False, "entries": [text[:30]] * 4}
+    if section_type == "text":
+        return {"type": "text", "header": text[:20], "content": text}
+    return {"type": section_type, "content": text}
+
+def make_set(modules, topics, sections):
+    return [{
+        "id": str(m),
+        "title": f"Module {m}",
+        "imgSrc": None,
+        "topics": [{
+            "title": f"Topic {t}",
+            "sections": [make_section(random.choice(SECTION_TYPES), s) for s in range(sections)],
+        } for t in range(topics)],
+        "assessment": [{
+            "question": f"Question {q}", "choices": {"a": "1", "b": "2", "c": "3", "d": "4"},
+            "answer": "a", "imgSrc": None, "caption": "", "attribution": "",
+        } for q in range(10)],
+    } for m in range(modules)]
+
+def measure(label, build):
+    """Time build() untraced, then build it again to measure what the result holds on to."""
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{label:<28} {size / 2**20:8.1f} MiB {elapsed * 1000:9.1f} ms")
+    return result
+
+def timed(label, fn):
+    start = time.perf_counter()
+    fn()
+    print(f"{label:<28} {'':12} {(time.perf_counter() - start) * 1000:9.1f} ms")
+
+def main():
+    modules = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    topics = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    sections = int(sys.argv[3]) if len(sys.argv) > 3 else 25
+
+    random.seed(0)
+    texts = [json.dumps(module, indent=2, ensure_ascii=True) for module in make_set(modules, topics, sections)]
+    print(f"{modules} modules x {topics} topics x {sections} sections, {sum(map(len, texts)) / 2**20:.1f} MiB of JSON")
+
+    dicts = measure("load as dicts", lambda: [json.loads(text) for text in texts])
+    records = measure("load as records", lambda: modules_from_json([json.loads(text) for text in texts]))
+
+    timed("dump dicts", lambda: [json.dumps(module, indent=2, ensure_ascii=True) for module in dicts])
+    timed("dump records", lambda: [json.dumps(plain(module), indent=2, ensure_ascii=True) for module in records])
+
+    same = all(json.dumps(plain(module), indent=2, ensure_ascii=True) == text for module, text in zip(records, texts))
+    print(f"records serialize identically: {same}")
+
+if __name__ == "__main__":
+    main()
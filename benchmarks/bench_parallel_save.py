@@ -0,0 +1,55 @@
+"""Save time of a 2,000-file media set against the number of compression workers.
+
+Usage: python benchmarks/bench_parallel_save.py [files] [file_kb]
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.archive import CompressionPolicy
+from core.module_set import ModuleSet
+
+def make_media(media_dir, files, file_kb):
+    """Write compressible files so the run is bound by deflate, not by disk."""
+    os.makedirs(media_dir)
+    words = [bytes(random.choices(b"abcdefghijklmnopqrstuvwxyz", k=random.randint(2, 9))) for _ in range(2000)]
+    for i in range(files):
+        data = b" ".join(random.choices(words, k=file_kb * 180))[:file_kb * 1024]
+        with open(os.path.join(media_dir, f"asset_{i}.svg"), "wb") as f:
+            f.write(data)
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    file_kb = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+
+    work_dir = tempfile.mkdtemp(prefix="modulearn-bench_")
+    try:
+        set_dir = os.path.join(work_dir, "set")
+        make_media(os.path.join(set_dir, "media"), files, file_kb)
+        module_set = ModuleSet.from_directory(set_dir)
+        module_set.compression = CompressionPolicy(stored_extensions=())
+        # No module references these files
+        module_set.drop_unused_media = False
+        zip_path = os.path.join(work_dir, "out.zip")
+
+        print(f"{files} files x {file_kb} KiB, {os.cpu_count()} CPUs")
+        baseline = None
+        workers = 1
+        while workers <= os.cpu_count():
+            module_set.source_entries = {}  # force a full save
+            start = time.perf_counter()
+            module_set.save(zip_path, workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{workers:3d} workers {elapsed:7.3f} s  speedup {baseline / elapsed:5.2f}x")
+            workers *= 2
+    finally:
+        shutil.rmtree(work_dir)
+
+if __name__ == "__main__":
+    main()
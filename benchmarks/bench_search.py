@@ -0,0 +1,142 @@
+"""Build, query and update times of core.search.SearchIndex, with consistency checks.
+
+After the edits the incrementally updated index is compared with one built
+from scratch, and so is an index built on another thread while edits keep
+coming, as the GUI builds it after opening a set.
+
+Usage: python benchmarks/bench_search.py [modules] [topics] [sections]
+"""
+import os
+import sys
+import time
+import random
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.model import TextSection, Topic, modules_from_json
+from core.module_set import ModuleSet
+from core.ops import delete_op, insert_op, set_op
+from core.search import SearchIndex
+
+# Lesson-like text: a few very common words and a long tail of rarer ones
+COMMON = "ang mga ng sa na at ay para ito the of and to in".split()
+SYLLABLES = "ba ka da ga ha la ma na pa ra sa ta wa ya bi ki li mi ni si ti bu ku lu mu nu su tu".split()
+
+def text(count):
+    words = []
+    for _ in range(count):
+        if random.random() < 0.4:
+            words.append(random.choice(COMMON))
+        else:
+            words.append("".join(random.choices(SYLLABLES, k=random.randint(2, 4))))
+    return " ".join(words)
+
+def make_set(modules, topics, sections):
+    return [{
+        "id": str(m),
+        "title": f"Modyul {m} {text(3)}",
+        "imgSrc": None,
+        "topics": [{
+            "title": f"Paksa {t} {text(2)}",
+            "sections": [{"type": "text", "header": text(3), "content": text(random.randint(20, 120))} for _ in range(sections)],
+        } for t in range(topics)],
+        "assessment": [{
+            "question": text(10), "choices": {"a": text(2), "b": text(2), "c": text(2), "d": text(2)},
+            "answer": "a", "imgSrc": None, "caption": "", "attribution": "",
+        } for _ in range(10)],
+    } for m in range(modules)]
+
+def timed(fn, runs=1):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def check_same(index, modules):
+    fresh = SearchIndex(modules)
+    fresh.build()
+    searchable = (set(index.vocabulary) | set(index.new_words)) - index.stale
+    if fresh.postings != index.postings or searchable != set(fresh.postings) or fresh.entries.keys() != index.entries.keys():
+        raise AssertionError("incrementally updated index differs from a rebuilt one")
+
+def random_edit(modules):
+    """Ops of a random section edit, insert or delete."""
+    module = random.randrange(len(modules))
+    topics = modules[module]["topics"]
+    if not topics:
+        return [insert_op([module, "topics", 0], Topic(title=text(2)))]
+    topic = random.randrange(len(topics))
+    sections = [module, "topics", topic, "sections"]
+    count = len(topics[topic]["sections"])
+    kind = random.random()
+    if count and kind < 0.6:
+        return [set_op(sections + [random.randrange(count), "content"], text(30))]
+    if count and kind < 0.8:
+        return [delete_op(sections + [random.randrange(count)])]
+    return [insert_op(sections + [random.randint(0, count)], TextSection(content=text(30)))]
+
+def main():
+    modules = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    topics = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    sections = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    random.seed(0)
+    module_set = ModuleSet()
+    module_set.modules = modules_from_json(make_set(modules, topics, sections))
+    index = SearchIndex(module_set.modules)
+    module_set.listeners.append(index.update)
+
+    print(f"{modules} modules x {topics} topics x {sections} sections ({modules * topics * sections} sections)")
+    elapsed, _ = timed(index.build)
+    print(f"build {elapsed:.2f} s, {len(index.entries)} items, {len(index.postings)} words")
+
+    rare = sorted(index.postings, key=lambda word: len(index.postings[word]))[len(index.postings) // 2]
+    queries = ["ang", "ang mga", rare, rare[:3], f"ang {rare}", "para ito", "bakalu", "zzz", "modyul 42"]
+    slowest = 0
+    for query in queries:
+        elapsed, hits = timed(lambda: index.search(query), runs=5)
+        slowest = max(slowest, elapsed)
+        print(f"query {query!r:<16} {elapsed * 1000:6.2f} ms  {len(hits)} hits")
+    print(f"slowest query {slowest * 1000:.2f} ms")
+
+    # Edits go through ModuleSet.apply like the editor's
+    edits = [
+        ("edit a section", [set_op([3, "topics", 2, "sections", 1, "content"], text(80))]),
+        ("insert a section", [insert_op([3, "topics", 2, "sections", 0], TextSection(content=text(50)))]),
+        ("delete a topic", [delete_op([4, "topics", 0])]),
+        ("insert a topic", [insert_op([4, "topics", 0], Topic(title="Bagong paksa", sections=[TextSection(content=text(30))]))]),
+        ("delete a module", [delete_op([0])]),
+    ]
+    for label, ops in edits:
+        elapsed, _ = timed(lambda: module_set.apply(ops))
+        print(f"{label:<18} {elapsed * 1000:6.2f} ms")
+
+    hits = index.search("bagong paksa")
+    if [hit.path for hit in hits] != [[3, "topics", 0]]:
+        raise AssertionError(f"unexpected hits {hits}")
+    check_same(index, module_set.modules)
+    print("index consistent")
+
+    index = SearchIndex(module_set.modules)
+    module_set.listeners[:] = [index.update]
+    index.begin_build()
+    builder = threading.Thread(target=index.build)
+    start = time.perf_counter()
+    builder.start()
+    edits = 0
+    while builder.is_alive():
+        module_set.apply(random_edit(module_set.modules))
+        edits += 1
+    builder.join()
+    index.finish_build()
+    elapsed = time.perf_counter() - start
+    check_same(index, module_set.modules)
+    module_set.cleanup()
+    print(f"background build {elapsed:.2f} s with {edits} edits meanwhile, consistent")
+
+if __name__ == "__main__":
+    main()
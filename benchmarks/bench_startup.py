@@ -0,0 +1,44 @@
+"""Cold start of the GUI, phase by phase, from modulearn-maker.py --profile-startup.
+
+The app is started several times with --profile-startup=exit, which closes
+it once the window is drawn, and the fastest time of each phase is shown.
+Needs a display and the GUI requirements.
+
+Usage: python benchmarks/bench_startup.py [runs]
+"""
+import os
+import re
+import sys
+import time
+import subprocess
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modulearn-maker.py")
+PHASE_LINE = re.compile(r"^\s+(.+?)\s+([\d.]+) ms$")
+
+def run_once():
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, SCRIPT, "--profile-startup=exit"], capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise SystemExit(f"modulearn-maker.py failed:\n{result.stderr.strip()}")
+    phases = {}
+    for line in result.stderr.splitlines():
+        match = PHASE_LINE.match(line)
+        if match:
+            phases[match.group(1)] = float(match.group(2))
+    # Includes interpreter startup and shutdown, which the profile cannot see
+    phases["whole process"] = elapsed * 1000
+    return phases
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    best = {}
+    for _ in range(runs):
+        for phase, ms in run_once().items():
+            best[phase] = min(ms, best.get(phase, ms))
+    print(f"fastest of {runs} runs")
+    for phase, ms in best.items():
+        print(f"  {phase:<24} {ms:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
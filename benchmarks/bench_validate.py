@@ -0,0 +1,47 @@
+"""Time of a full core.schema validation pass over a generated set.
+
+Usage: python benchmarks/bench_validate.py [modules] [topics] [sections]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_model import make_set
+from core.model import modules_from_json
+from core.schema import validate_modules
+
+def best_of(runs, fn):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    modules = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    topics = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    sections = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    random.seed(0)
+    dicts = make_set(modules, topics, sections)
+    records = modules_from_json(dicts)
+    print(f"{modules} modules x {topics} topics x {sections} sections")
+    for label, data in (("dicts", dicts), ("records", records)):
+        elapsed = best_of(5, lambda: validate_modules(data, has_media=lambda name: True))
+        print(f"{label:<8} {elapsed * 1000:7.1f} ms  {elapsed / modules * 1e6:6.1f} us per module")
+
+    # Every problem kind once, to show the reports
+    broken = make_set(3, 1, 2)
+    broken[0]["title"] = ""
+    broken[1]["topics"][0]["sections"][0] = {"type": "video"}
+    broken[2]["assessment"][0]["answer"] = "e"
+    for problem in validate_modules(modules_from_json(broken), has_media=lambda name: False):
+        print(problem)
+
+if __name__ == "__main__":
+    main()
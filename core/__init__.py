@@ -0,0 +1,5 @@
+from core.media import iter_media_refs, media_refcounts
+from core.model import Module, Question, Topic, new_section
+from core.module_set import InvalidModuleSet, ModuleSet, OperationCancelled
+from core.schema import Problem, validate_modules
+from core.search import SearchIndex
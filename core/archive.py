@@ -0,0 +1,122 @@
+import os
+import time
+import zlib
+import struct
+import zipfile
+from collections import deque
+
+# Data descriptor flag; entries copied here always carry their sizes in the header
+DATA_DESCRIPTOR_FLAG = 0x08
+
+# Formats that are already compressed; deflating them again costs CPU for nothing
+INCOMPRESSIBLE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif")
+
+class CompressionPolicy:
+    """Decides how each archive entry is compressed.
+
+    Incompressible media is stored as-is, module JSON is deflated at json_level
+    and any other file at other_level. ModuLearn only reads stored and deflated
+    entries, so the faster setting trades size for speed with a lower deflate
+    level rather than a different codec.
+    """
+    def __init__(self, json_level=6, other_level=6, stored_extensions=INCOMPRESSIBLE_EXTENSIONS):
+        self.json_level = json_level
+        self.other_level = other_level
+        self.stored_extensions = tuple(stored_extensions)
+
+    @classmethod
+    def fast(cls):
+        return cls(json_level=1, other_level=1)
+
+    def for_entry(self, arcname):
+        """Return (compress_type, compresslevel) for an archive member."""
+        ext = os.path.splitext(arcname)[1].lower()
+        if ext in self.stored_extensions:
+            return zipfile.ZIP_STORED, None
+        if ext == ".json":
+            return zipfile.ZIP_DEFLATED, self.json_level
+        return zipfile.ZIP_DEFLATED, self.other_level
+
+def read_raw_entry(source, zinfo):
+    """Return the still-compressed bytes of an entry in an open ZipFile."""
+    fp = source.fp
+    fp.seek(zinfo.header_offset)
+    fheader = struct.unpack(zipfile.structFileHeader, fp.read(zipfile.sizeFileHeader))
+    if fheader[zipfile._FH_SIGNATURE] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"Bad local file header for {zinfo.filename}")
+    fp.seek(fheader[zipfile._FH_FILENAME_LENGTH] + fheader[zipfile._FH_EXTRA_FIELD_LENGTH], 1)
+    return fp.read(zinfo.compress_size)
+
+def write_raw_entry(target, zinfo, raw):
+    """Append an already-compressed entry to a ZipFile opened for writing.
+
+    zipfile has no public API for this, so it mirrors what ZipFile.open(mode="w")
+    does when it finishes an entry.
+    """
+    new_info = zipfile.ZipInfo(zinfo.filename, zinfo.date_time)
+    new_info.compress_type = zinfo.compress_type
+    new_info.CRC = zinfo.CRC
+    new_info.compress_size = len(raw)
+    new_info.file_size = zinfo.file_size
+    new_info.external_attr = zinfo.external_attr
+    new_info.flag_bits = zinfo.flag_bits & ~DATA_DESCRIPTOR_FLAG
+
+    target.fp.seek(target.start_dir)
+    new_info.header_offset = target.fp.tell()
+    target._didModify = True
+    target.fp.write(new_info.FileHeader())
+    target.fp.write(raw)
+    target.start_dir = target.fp.tell()
+    target.filelist.append(new_info)
+    target.NameToInfo[new_info.filename] = new_info
+    return new_info
+
+def copy_entry(source, zinfo, target):
+    """Copy an entry between ZIP files without decompressing or recompressing it."""
+    return write_raw_entry(target, zinfo, read_raw_entry(source, zinfo))
+
+def compress_entry(arcname, policy, data=None, path=None):
+    """Compress one entry the same way ZipFile.write/writestr would.
+
+    Pass either the entry's bytes or the path of the file to read them from.
+    Returns (ZipInfo, compressed bytes) ready for write_raw_entry.
+    """
+    if path is not None:
+        zinfo = zipfile.ZipInfo.from_file(path, arcname)
+        with open(path, "rb") as f:
+            data = f.read()
+    else:
+        zinfo = zipfile.ZipInfo(arcname, time.localtime(time.time())[:6])
+        zinfo.external_attr = 0o600 << 16
+
+    compress_type, level = policy.for_entry(arcname)
+    zinfo.compress_type = compress_type
+    zinfo.file_size = len(data)
+    zinfo.CRC = zlib.crc32(data)
+    if compress_type == zipfile.ZIP_DEFLATED:
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION if level is None else level, zlib.DEFLATED, -15)
+        raw = compressor.compress(data) + compressor.flush()
+    else:
+        raw = data
+    return zinfo, raw
+
+def ordered_map(fn, items, workers=1):
+    """Like map(), but runs fn on a thread pool while yielding results in order.
+
+    zlib and file reads release the GIL, so threads scale across cores. At most
+    two results per worker are kept waiting, which bounds memory use.
+    """
+    if workers <= 1:
+        yield from map(fn, items)
+        return
+
+    # Imported here so that starting the GUI does not pay for concurrent.futures
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
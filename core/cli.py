@@ -0,0 +1,140 @@
+import os
+import sys
+import shutil
+import argparse
+
+from core.archive import CompressionPolicy
+from core.export import ExportProfile
+from core.importer import plan_import
+from core.media import MediaPipeline, clone_or_copy, format_report, optimize_media
+from core.module_set import InvalidModuleSet, ModuleSet
+
+COMMANDS = ("build", "validate", "unpack", "import")
+
+def wants_cli(argv):
+    """Return True if the arguments ask for a headless command instead of the GUI."""
+    return bool(argv) and argv[0] in COMMANDS + ("-h", "--help")
+
+def load(path):
+    """Load a module set from a ZIP file or an unpacked directory."""
+    if os.path.isdir(path):
+        return ModuleSet.from_directory(path)
+    return ModuleSet.from_archive(path, lazy=True)
+
+def working_copy(path):
+    """Load a module set from a cloned copy of a directory, so changed media never lands in the source tree."""
+    module_set = ModuleSet()
+    shutil.copytree(path, module_set.temp_dir, dirs_exist_ok=True, copy_function=clone_or_copy)
+    module_set.load()
+    return module_set
+
+def build(args):
+    if args.optimize_images:
+        module_set = working_copy(args.source)
+    else:
+        module_set = ModuleSet.from_directory(args.source)
+
+    try:
+        if args.optimize_images:
+            pipeline = MediaPipeline(max_dimension=args.max_dimension, format=args.image_format, quality=args.quality)
+            report = optimize_media(module_set, pipeline, workers=args.jobs or None)
+            print(format_report(report))
+        module_set.compression = CompressionPolicy.fast() if args.fast else CompressionPolicy(json_level=args.json_level)
+        module_set.export_profile = ExportProfile(args.json_profile, backend=args.json_backend)
+        plan = module_set.save(args.output, workers=args.jobs or os.cpu_count())
+        for arcname, size in plan.dropped:
+            print(f"Dropped unused {arcname} ({size} bytes)")
+    finally:
+        module_set.cleanup()
+    print(f"Built {args.output} ({len(module_set.modules)} modules)")
+    return 0
+
+def validate(args):
+    status = 0
+    for path in args.paths:
+        try:
+            module_set = load(path)
+        except InvalidModuleSet as e:
+            problems = e.problems
+        else:
+            try:
+                problems = module_set.validate()
+            finally:
+                module_set.cleanup()
+
+        for problem in problems:
+            print(f"{path}: {problem}", file=sys.stderr)
+        if problems:
+            status = 1
+        else:
+            print(f"{path}: OK ({len(module_set.modules)} modules)")
+    return status
+
+def import_sources(args):
+    if args.into is None:
+        module_set = ModuleSet()
+    elif os.path.isdir(args.into):
+        module_set = working_copy(args.into)
+    else:
+        module_set = ModuleSet.from_archive(args.into, lazy=True)
+
+    try:
+        plan = plan_import(args.sources, module_set.import_media)
+        count = len(module_set.modules)
+        module_set.apply(plan.ops(module_set.modules))
+        added = len(module_set.modules) - count
+        for problem in module_set.validate():
+            print(f"Warning: {problem}", file=sys.stderr)
+        module_set.export_profile = ExportProfile(args.json_profile)
+        module_set.save(args.output, workers=os.cpu_count())
+    finally:
+        module_set.cleanup()
+    print(f"Imported {added} new modules and {plan.question_count} questions into {args.output} ({count + added} modules)")
+    return 0
+
+def unpack(args):
+    os.makedirs(args.output, exist_ok=True)
+    module_set = ModuleSet.from_archive(args.archive, temp_dir=args.output)
+    print(f"Unpacked {len(module_set.modules)} modules to {args.output}")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="modulearn-maker", description="Build, import and check ModuLearn module sets without the GUI.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="zip an unpacked module set directory")
+    build_parser.add_argument("source", help="directory containing module_N.json files and media/")
+    build_parser.add_argument("output", help="ZIP file to write")
+    build_parser.add_argument("--json-level", type=int, default=6, choices=range(0, 10), metavar="0-9", help="deflate level for module JSON (default: 6)")
+    build_parser.add_argument("-j", "--jobs", type=int, default=0, help="compression threads (default: one per CPU)")
+    build_parser.add_argument("--fast", action="store_true", help="favour save speed over archive size")
+    build_parser.add_argument("--json-profile", choices=ExportProfile.PROFILES, default="pretty", help="pretty: indented and ASCII-escaped, compact: minified UTF-8 (default: pretty)")
+    build_parser.add_argument("--json-backend", choices=ExportProfile.BACKENDS, default="auto", help="encoder for --json-profile compact; auto uses orjson if installed (default: auto)")
+    build_parser.add_argument("--optimize-images", action="store_true", help="downscale and re-encode referenced images")
+    build_parser.add_argument("--max-dimension", type=int, default=1600, help="longest image side after --optimize-images (default: 1600)")
+    build_parser.add_argument("--image-format", choices=sorted(MediaPipeline.FORMATS), help="re-encode images to this format (default: keep)")
+    build_parser.add_argument("--quality", type=int, default=85, help="JPEG/WebP quality for --optimize-images (default: 85)")
+    build_parser.set_defaults(func=build)
+
+    validate_parser = subparsers.add_parser("validate", help="check module sets for problems")
+    validate_parser.add_argument("paths", nargs="+", help="ZIP files or unpacked directories")
+    validate_parser.set_defaults(func=validate)
+
+    import_parser = subparsers.add_parser("import", help="add modules from Markdown and quiz questions from CSV")
+    import_parser.add_argument("output", help="ZIP file to write")
+    import_parser.add_argument("sources", nargs="+", help="Markdown (.md) and CSV (.csv) files, see core/importer.py for their format")
+    import_parser.add_argument("--into", help="module set ZIP or directory to add to (default: start a new set)")
+    import_parser.add_argument("--json-profile", choices=ExportProfile.PROFILES, default="pretty", help="module JSON format, as for build (default: pretty)")
+    import_parser.set_defaults(func=import_sources)
+
+    unpack_parser = subparsers.add_parser("unpack", help="extract a module set ZIP into a directory")
+    unpack_parser.add_argument("archive", help="ZIP file to extract")
+    unpack_parser.add_argument("output", help="directory to extract into")
+    unpack_parser.set_defaults(func=unpack)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
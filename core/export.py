@@ -0,0 +1,57 @@
+import json
+from functools import cache
+
+from core.model import json_default, plain
+
+@cache
+def load_orjson():
+    """Return the optional faster encoder, or None if it is not installed.
+
+    It is imported on first use, since a GUI that saves pretty JSON never needs it.
+    """
+    try:
+        import orjson
+    except ImportError:  # The stdlib encoder is used without it
+        return None
+    return orjson
+
+class ExportProfile:
+    """Decides how module JSON is encoded in saved archives.
+
+    "pretty" is the original format, indented with every non-ASCII character
+    escaped as \\uXXXX. "compact" is minified UTF-8, which is much smaller for
+    lessons that are not in English; ModuLearn reads both. The compact profile
+    is encoded with orjson when it is installed, unless backend="json" asks for
+    the stdlib encoder; both produce the same bytes for module data.
+    """
+    PROFILES = ("pretty", "compact")
+    BACKENDS = ("auto", "json", "orjson")
+
+    def __init__(self, name="pretty", backend="auto"):
+        if name not in self.PROFILES:
+            raise ValueError(f"Unknown JSON profile: {name!r}")
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown JSON backend: {backend!r}")
+        if backend == "orjson" and load_orjson() is None:
+            raise ValueError("The orjson backend needs the orjson package")
+        self.name = name
+        self.backend = backend
+
+    @classmethod
+    def compact(cls):
+        return cls("compact")
+
+    def uses_orjson(self):
+        return self.name == "compact" and self.backend != "json" and load_orjson() is not None
+
+    def encode(self, module):
+        """Return the bytes a module is saved as."""
+        if self.name == "pretty":
+            # Indented output goes through json's pure-Python encoder, which is
+            # faster on plain dicts than calling a default hook per record
+            return json.dumps(plain(module), indent=2, ensure_ascii=True).encode("utf-8")
+        if self.uses_orjson():
+            # Records are dataclasses, which orjson would write by attribute name
+            orjson = load_orjson()
+            return orjson.dumps(module, default=json_default, option=orjson.OPT_PASSTHROUGH_DATACLASS)
+        return json.dumps(module, ensure_ascii=False, separators=(",", ":"), default=json_default).encode("utf-8")
@@ -0,0 +1,73 @@
+from collections import deque
+
+from core.model import Record
+
+def value_cost(value):
+    """Rough number of bytes a value in an op keeps alive."""
+    if isinstance(value, Record):
+        # Counted like the dict it is saved as
+        value = value.as_json()
+    if isinstance(value, str):
+        return 50 + len(value)
+    if isinstance(value, dict):
+        return 64 + sum(50 + len(key) + value_cost(item) for key, item in value.items())
+    if isinstance(value, list):
+        return 56 + sum(8 + value_cost(item) for item in value)
+    return 24
+
+def ops_cost(ops):
+    return sum(64 + 8 * len(path) + value_cost(value) for _, path, value in ops)
+
+class History:
+    """Undo and redo stacks of changes made through ModuleSet.apply().
+
+    A change is kept as the ops that revert it, see core.ops, and undoing it
+    keeps the ops that revert the undo for redo. Every step therefore costs as
+    much as the change itself, however large the set is, and nothing is ever
+    deep-copied. The oldest changes are forgotten once the ops on both stacks
+    hold more than budget bytes, or there are more than max_changes of them.
+    """
+    DEFAULT_BUDGET = 16 * 1024 * 1024
+
+    def __init__(self, budget=DEFAULT_BUDGET, max_changes=1000):
+        self.budget = budget
+        self.max_changes = max_changes
+        # (ops, cost) pairs, most recent last
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.cost = 0
+
+    def record(self, inverse):
+        """Remember a new change by its inverse ops; this drops the redo stack."""
+        self.cost -= sum(cost for _, cost in self.redo_stack)
+        self.redo_stack.clear()
+        self.push(self.undo_stack, inverse)
+
+    def push(self, stack, ops):
+        cost = ops_cost(ops)
+        stack.append((ops, cost))
+        self.cost += cost
+        while self.undo_stack and (self.cost > self.budget or len(self.undo_stack) + len(self.redo_stack) > self.max_changes):
+            self.cost -= self.undo_stack.popleft()[1]
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self, module_set):
+        """Revert the last change and return the ops that were applied, or None."""
+        return self.step(module_set, self.undo_stack, self.redo_stack)
+
+    def redo(self, module_set):
+        """Apply the last undone change again and return the ops that were applied, or None."""
+        return self.step(module_set, self.redo_stack, self.undo_stack)
+
+    def step(self, module_set, source, target):
+        if not source:
+            return None
+        ops, cost = source.pop()
+        self.cost -= cost
+        self.push(target, module_set.apply(ops))
+        return ops
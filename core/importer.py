@@ -0,0 +1,368 @@
+"""Bulk import of modules from Markdown and of quiz questions from CSV.
+
+Sources are read as a pipeline of generators: lines go in one at a time and
+each finished module or question comes out before the next line is read, so
+only the records themselves are ever held, never a whole source file.
+plan_import() collects them into an ImportPlan, and ImportPlan.ops() turns
+that into core.ops ops. The whole import is then one change to apply, journal
+and undo.
+
+Markdown maps onto the module structure like this:
+
+    # Module title
+    ## Topic title
+    ### Header                 header of the text section or list below it
+    Paragraphs                 text section
+    - item / 1. item           list section, unordered / ordered
+    ![caption](file.png "attribution")
+                               image section, the file is imported as media
+    > Trivia: ...              trivia section
+    > Remember: ...            remember section (also any other quote)
+    Q: ... followed by A: ...  active-recall section
+
+CSV files need a header row with question and answer columns and one column
+per choice, named by its letter (a, b, c, ...). Optional columns are module
+(the id or title of the module the question goes into), image, caption and
+attribution. The answer may be a choice letter or the text of a choice.
+"""
+import os
+import re
+import csv
+
+from core.model import (ContentSection, ImageSection, ListSection, Module, Question,
+                        RecallSection, TextSection, Topic)
+from core.module_set import OperationCancelled
+from core.ops import insert_op, set_op
+
+MARKDOWN_EXTENSIONS = (".md", ".markdown")
+CSV_EXTENSIONS = (".csv",)
+
+HEADING = re.compile(r"^(#{1,3})\s+(.*?)(?:\s+#+)?$")
+BULLET = re.compile(r"^\s{0,3}[-*+]\s+(.*)$")
+NUMBERED = re.compile(r"^\s{0,3}\d+[.)]\s+(.*)$")
+IMAGE = re.compile(r'^!\[(.*?)\]\(\s*(\S+?)(?:\s+"(.*?)")?\s*\)$')
+QUOTE = re.compile(r"^>\s?(.*)$")
+CALLOUT = re.compile(r"^(?:\*\*)?(trivia|remember)(?::\*\*|\*\*:|:)\s*(.*)$", re.IGNORECASE)
+RECALL_QUESTION = re.compile(r"^Q:\s*(.*)$")
+RECALL_ANSWER = re.compile(r"^A:\s*(.*)$")
+
+def media_resolver(import_media, base_dir):
+    """Return a function that turns an image reference in a source into an imgSrc.
+
+    Local files are imported through import_media, e.g. ModuleSet.import_media.
+    References to files that do not exist are kept as they are, for
+    validation to report.
+    """
+    def resolve(src):
+        if not src:
+            return None
+        path = os.path.join(base_dir, src)
+        if import_media is None or "://" in src or not os.path.isfile(path):
+            return src
+        return import_media(path)
+    return resolve
+
+def paragraphs(lines):
+    """Join lines into paragraphs at the empty lines between them."""
+    paragraph = []
+    for line in lines:
+        if line:
+            paragraph.append(line)
+        elif paragraph:
+            yield " ".join(paragraph)
+            paragraph = []
+    if paragraph:
+        yield " ".join(paragraph)
+
+class MarkdownReader:
+    """Turns Markdown lines into Modules, see the module docstring for the format."""
+    def __init__(self, resolve_media=None, title="Untitled Module"):
+        self.resolve_media = resolve_media or (lambda src: src)
+        # Title of a module whose content comes before any # heading
+        self.title = title
+        self.module = None
+        self.topic = None
+        # A ### heading waiting for the section it belongs to
+        self.header = None
+        # The block being read: "text", "list", "quote" or "recall", and its lines
+        self.block = None
+        self.lines = []
+        self.category = None
+        self.callout = None
+        self.answer = None
+
+    def read(self, lines):
+        """Yield each module as soon as it is complete."""
+        for line in lines:
+            module = self.feed(line.rstrip())
+            if module is not None:
+                yield module
+        module = self.finish_module()
+        if module is not None:
+            yield module
+
+    def feed(self, line):
+        """Take one line; return the previous module when this one starts a new one."""
+        heading = HEADING.match(line)
+        if heading:
+            self.finish_block()
+            level, title = len(heading.group(1)), heading.group(2)
+            if level == 1:
+                done = self.finish_module()
+                self.module = Module(title=title)
+                return done
+            if level == 2:
+                self.topic = Topic(title=title)
+                self.current_module().topics.append(self.topic)
+            else:
+                self.header = title
+            return None
+
+        if not line.strip():
+            if self.block == "text":
+                # Paragraph break
+                if self.lines and self.lines[-1]:
+                    self.lines.append("")
+            elif self.block is not None:
+                self.finish_block()
+            return None
+
+        image = IMAGE.match(line.strip())
+        if image:
+            self.finish_block()
+            caption, src, attribution = image.groups()
+            self.add_section(ImageSection(img_src=self.resolve_media(src), caption=caption, attribution=attribution or ""))
+            return None
+
+        quote = QUOTE.match(line)
+        if quote:
+            text = quote.group(1).strip()
+            if self.block != "quote":
+                self.start_block("quote")
+                callout = CALLOUT.match(text)
+                self.callout = callout.group(1).lower() if callout else "remember"
+                text = callout.group(2) if callout else text
+            self.lines.append(text)
+            return None
+
+        item = BULLET.match(line) or NUMBERED.match(line)
+        if item:
+            category = "unordered" if BULLET.match(line) else "ordered"
+            if self.block != "list" or self.category != category:
+                self.start_block("list")
+                self.category = category
+            self.lines.append(item.group(1).strip())
+            return None
+
+        question = RECALL_QUESTION.match(line)
+        if question:
+            self.start_block("recall")
+            self.lines.append(question.group(1))
+            self.answer = None
+            return None
+        answer = RECALL_ANSWER.match(line)
+        if answer and self.block == "recall" and self.answer is None:
+            self.answer = [answer.group(1)]
+            return None
+
+        # Continuation of the block being read, or the start of a paragraph
+        text = line.strip()
+        if self.block == "list":
+            self.lines[-1] += " " + text
+        elif self.block == "quote":
+            self.lines.append(text)
+        elif self.block == "recall":
+            (self.answer if self.answer is not None else self.lines).append(text)
+        else:
+            if self.block != "text":
+                self.start_block("text")
+            self.lines.append(text)
+        return None
+
+    def start_block(self, block):
+        # A pending ### heading stays for the new block
+        if self.block is not None:
+            self.finish_block()
+        self.block = block
+
+    def current_module(self):
+        if self.module is None:
+            self.module = Module(title=self.title)
+        return self.module
+
+    def add_section(self, section):
+        module = self.current_module()
+        if self.topic is None:
+            self.topic = Topic(title=f"Topic {len(module.topics)}")
+            module.topics.append(self.topic)
+        self.topic.sections.append(section)
+
+    def finish_block(self):
+        """Add the block being read as a section."""
+        block, lines, header = self.block, self.lines, self.header
+        self.block = None
+        self.lines = []
+        self.header = None
+        if block == "text":
+            self.add_section(TextSection(header=header or "", content="\n\n".join(paragraphs(lines))))
+        elif block == "list":
+            entries = ([header] if header else []) + lines
+            self.add_section(ListSection(category=self.category, has_header=bool(header), entries=entries))
+        elif block == "quote":
+            if header:
+                self.add_section(TextSection(header=header))
+            self.add_section(ContentSection(type=self.callout, content=" ".join(lines)))
+        elif block == "recall":
+            if header:
+                self.add_section(TextSection(header=header))
+            self.add_section(RecallSection(question=" ".join(lines), answer=" ".join(self.answer or [])))
+        elif header:
+            self.add_section(TextSection(header=header))
+
+    def finish_module(self):
+        self.finish_block()
+        module = self.module
+        self.module = None
+        self.topic = None
+        return module
+
+def read_markdown(path, import_media=None):
+    """Yield the Modules of a Markdown file, reading it line by line."""
+    title = os.path.splitext(os.path.basename(path))[0]
+    reader = MarkdownReader(media_resolver(import_media, os.path.dirname(path)), title=title)
+    with open(path, "r", encoding="utf-8-sig") as f:
+        yield from reader.read(f)
+
+def read_questions(path, import_media=None):
+    """Yield (module key, Question) for every row of a CSV question bank.
+
+    The key is the row's module column, or None without one.
+    """
+    resolve_media = media_resolver(import_media, os.path.dirname(path))
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        rows = csv.reader(f)
+        header = [name.strip().lower() for name in next(rows, [])]
+        columns = {name: i for i, name in enumerate(header)}
+        if "question" not in columns or "answer" not in columns:
+            raise ValueError(f"{os.path.basename(path)}: expected a header row with question and answer columns")
+        choice_columns = [(name, i) for i, name in enumerate(header) if len(name) == 1 and name.isalpha()]
+        question_column, answer_column = columns["question"], columns["answer"]
+        module_column = columns.get("module")
+        image_column = columns.get("image", columns.get("imgsrc"))
+        caption_column = columns.get("caption")
+        attribution_column = columns.get("attribution")
+
+        def cell(row, i):
+            return row[i].strip() if i is not None and i < len(row) else ""
+
+        for row in rows:
+            if not any(value.strip() for value in row):
+                continue
+            choices = {letter: cell(row, i) for letter, i in choice_columns}
+            answer = cell(row, answer_column)
+            if answer.lower() in choices:
+                answer = answer.lower()
+            else:
+                # The text of a choice rather than its letter
+                answer = next((letter for letter, text in choices.items() if text and text == answer), answer)
+            yield cell(row, module_column) or None, Question(
+                question=cell(row, question_column),
+                choices=choices,
+                answer=answer,
+                img_src=resolve_media(cell(row, image_column)),
+                caption=cell(row, caption_column),
+                attribution=cell(row, attribution_column),
+            )
+
+def read_source(path, import_media=None):
+    """Yield ("module", Module) or ("question", (key, Question)) for one source file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in MARKDOWN_EXTENSIONS:
+        for module in read_markdown(path, import_media):
+            yield "module", module
+    elif ext in CSV_EXTENSIONS:
+        for item in read_questions(path, import_media):
+            yield "question", item
+    else:
+        raise ValueError(f"Cannot import {os.path.basename(path)}: expected a Markdown (.md) or CSV (.csv) file")
+
+class ImportPlan:
+    """Records read by plan_import(), to be added to a module list through ops()."""
+    # Module for questions without a module column when there is no target
+    DEFAULT_TITLE = "Imported questions"
+
+    def __init__(self, target=None):
+        # Module that questions without a module column go into, if it is still there by then
+        self.target = target
+        self.modules = []
+        # module key -> Questions, in source order
+        self.questions = {}
+        self.question_count = 0
+
+    def add_question(self, key, question):
+        self.questions.setdefault(key, []).append(question)
+        self.question_count += 1
+
+    def ops(self, modules):
+        """Ops that add the imported records to modules.
+
+        Questions join the quiz of the module their key names, by id or
+        title. Modules that do not exist yet are created at the end, after
+        the imported Markdown modules.
+        """
+        new_modules = list(self.modules)
+        by_key = {}
+        for module in reversed(modules + new_modules):
+            by_key[module.get("title")] = module
+        for module in reversed(modules):
+            by_key[module.get("id")] = module
+        indices = {module.uid: i for i, module in enumerate(modules)}
+
+        additions = {}
+        for key, questions in self.questions.items():
+            module = None
+            if key is None:
+                target = self.target
+                if target is not None and (target.uid in indices or target in new_modules):
+                    module = target
+                key = self.DEFAULT_TITLE
+            module = module or by_key.get(key)
+            if module is None:
+                module = by_key[key] = Module(title=key)
+                new_modules.append(module)
+            additions.setdefault(module.uid, (module, []))[1].extend(questions)
+
+        ops = []
+        for uid, (module, questions) in additions.items():
+            quiz = (module.get("assessment") or []) + questions
+            if uid in indices:
+                # One op for the whole quiz rather than one per question
+                ops.append(set_op([indices[uid], "assessment"], quiz))
+            else:
+                module["assessment"] = quiz
+        for i, module in enumerate(new_modules, len(modules)):
+            module["id"] = str(i)
+            ops.append(insert_op([i], module))
+        return ops
+
+def plan_import(paths, import_media=None, target=None, progress=None, cancel_event=None):
+    """Read Markdown and CSV sources into an ImportPlan.
+
+    Images the sources reference are imported through import_media, e.g.
+    ModuleSet.import_media. progress(done, total, name) is called per source
+    file, and setting cancel_event aborts with OperationCancelled.
+    """
+    plan = ImportPlan(target)
+    for done, path in enumerate(paths):
+        if progress:
+            progress(done, len(paths), os.path.basename(path))
+        for kind, item in read_source(path, import_media):
+            if cancel_event is not None and cancel_event.is_set():
+                raise OperationCancelled()
+            if kind == "module":
+                plan.modules.append(item)
+            else:
+                plan.add_question(*item)
+    if progress:
+        progress(len(paths), len(paths), "")
+    return plan
@@ -0,0 +1,208 @@
+import os
+import re
+import json
+import glob
+import shutil
+import tempfile
+import threading
+import time
+
+from core.model import json_default
+from core.ops import apply_ops
+
+# Kept inside the working directory, which file_entries() never saves
+JOURNAL_DIR = ".journal"
+SNAPSHOT_FILE = "snapshot.json"
+LOG_FILE = "changes.jsonl"
+# Logs set aside by Journal.rotate() until fold() replays them, named by their last seq
+ROTATED_LOG_PATTERN = re.compile(r"^changes\.(\d+)\.jsonl$")
+OWNER_FILE = "owner"
+
+def journal_dir(temp_dir):
+    return os.path.join(temp_dir, JOURNAL_DIR)
+
+def pid_alive(pid):
+    """Return True if a process with this id is running."""
+    if os.name == "nt":
+        import ctypes
+        # os.kill(pid, 0) would send CTRL_C_EVENT on Windows
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class Journal:
+    """Append-only log of the edits made to a module set, for crash recovery.
+
+    The journal lives in the module set's working directory. snapshot.json
+    holds the modules as of the last compaction, and changes.jsonl one line
+    [seq, ops] per change since then, written with a single write() and flush,
+    so journaling an edit costs about as much as serializing the edit itself.
+
+    Compaction never serializes the live modules: rotate() sets the log aside
+    and starts a new one, and fold() replays the logs set aside onto
+    snapshot.json. fold() only touches journal files, so it can run on a
+    worker thread while edits are appended to the new log. The sequence
+    numbers make replay skip changes a snapshot already contains, so a crash
+    at any point of a compaction is harmless.
+
+    The owner file holds the pid of the process editing the set. It is only
+    removed together with the working directory, so a journal whose owner is
+    gone was left behind by an unclean exit, see find_recoverable().
+    """
+    def __init__(self, temp_dir):
+        self.dir = journal_dir(temp_dir)
+        self.log = None
+        self.seq = 0
+        # Changes written to the current log
+        self.pending = 0
+        # Set by append(), cleared by rotate(saved=True)
+        self.unsaved = False
+        # Held by fold() and close(), so a fold never runs into another or a removed directory
+        self.fold_lock = threading.Lock()
+
+    def start(self, modules, state, unsaved=False):
+        """Take ownership of the working directory and write the first snapshot."""
+        os.makedirs(self.dir, exist_ok=True)
+        with open(os.path.join(self.dir, OWNER_FILE), "w", encoding="utf-8") as f:
+            f.write(str(os.getpid()))
+        self.unsaved = unsaved
+        self.write_snapshot(dict(state, modules=modules, seq=self.seq, unsaved=unsaved, time=time.time()))
+        # Logs of an earlier journal in this directory are in the snapshot now
+        for _, path in rotated_logs(self.dir):
+            os.remove(path)
+        self.log = open(os.path.join(self.dir, LOG_FILE), "w", encoding="utf-8")
+        self.pending = 0
+
+    def append(self, ops):
+        self.seq += 1
+        self.log.write(json.dumps([self.seq, ops], ensure_ascii=False, separators=(",", ":"), default=json_default) + "\n")
+        self.log.flush()
+        self.pending += 1
+        self.unsaved = True
+
+    def rotate(self, state, saved=False):
+        """Set the log aside for fold() and start a new one.
+
+        Returns the header of the snapshot fold() writes: state, see
+        ModuleSet.journal_state(), and where the set stands now. With
+        saved=True the set is recorded as saved, so it is not offered for
+        recovery unless it is edited again.
+        """
+        if saved:
+            self.unsaved = False
+        if self.pending:
+            self.log.close()
+            log_path = os.path.join(self.dir, LOG_FILE)
+            os.replace(log_path, os.path.join(self.dir, f"changes.{self.seq}.jsonl"))
+            self.log = open(log_path, "w", encoding="utf-8")
+            self.pending = 0
+        return dict(state, seq=self.seq, unsaved=self.unsaved)
+
+    def fold(self, header):
+        """Replay the logs rotate() set aside up to header["seq"] onto the snapshot."""
+        with self.fold_lock:
+            if self.log is None:
+                return
+            snapshot = read_snapshot(self.dir)
+            if snapshot["seq"] > header["seq"]:
+                return
+            modules = snapshot["modules"]
+            logs = [(seq, path) for seq, path in rotated_logs(self.dir) if seq <= header["seq"]]
+            for _, path in logs:
+                for ops in read_changes(path, snapshot["seq"]):
+                    apply_ops(modules, ops)
+            self.write_snapshot(dict(header, modules=modules, time=time.time()))
+            for _, path in logs:
+                os.remove(path)
+
+    def write_snapshot(self, snapshot):
+        path = os.path.join(self.dir, SNAPSHOT_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"), default=json_default)
+        os.replace(path + ".tmp", path)
+
+    def close(self):
+        with self.fold_lock:
+            if self.log is not None:
+                self.log.close()
+                self.log = None
+
+def read_snapshot(directory):
+    with open(os.path.join(directory, SNAPSHOT_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def rotated_logs(directory):
+    """Return (seq, path) of the logs Journal.rotate() set aside, oldest first."""
+    found = []
+    for name in os.listdir(directory):
+        match = ROTATED_LOG_PATTERN.match(name)
+        if match:
+            found.append((int(match.group(1)), os.path.join(directory, name)))
+    return sorted(found)
+
+def read_changes(path, after):
+    """Return the ops lists logged in path after seq number after.
+
+    Reading stops at a line that was cut short by a crash.
+    """
+    changes = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                seq, ops = json.loads(line)
+            except ValueError:
+                break
+            if seq > after:
+                changes.append(ops)
+    return changes
+
+def read_journal(temp_dir):
+    """Return (snapshot, changes) of a journal, changes as a list of op lists.
+
+    Changes the snapshot already contains are skipped, and reading stops at a
+    line that was cut short by the crash.
+    """
+    directory = journal_dir(temp_dir)
+    snapshot = read_snapshot(directory)
+
+    changes = []
+    paths = [path for _, path in rotated_logs(directory)]
+    log_path = os.path.join(directory, LOG_FILE)
+    if os.path.exists(log_path):
+        paths.append(log_path)
+    for path in paths:
+        changes += read_changes(path, snapshot["seq"])
+    return snapshot, changes
+
+def find_recoverable(root=None):
+    """Return (time, working directory) of sets with unsaved edits whose editing process is gone.
+
+    Newest first, time being that of the last snapshot. Directories with
+    nothing worth recovering are removed.
+    """
+    found = []
+    pattern = os.path.join(root or tempfile.gettempdir(), "modulearn-maker_*", JOURNAL_DIR, OWNER_FILE)
+    for owner_path in glob.glob(pattern):
+        temp_dir = os.path.dirname(os.path.dirname(owner_path))
+        try:
+            with open(owner_path, "r", encoding="utf-8") as f:
+                pid = int(f.read().strip() or 0)
+            if pid == os.getpid() or pid_alive(pid):
+                continue
+            snapshot, changes = read_journal(temp_dir)
+        except (OSError, ValueError):
+            continue
+        if snapshot.get("unsaved") or changes:
+            found.append((snapshot.get("time", 0), temp_dir))
+        else:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    return sorted(found, reverse=True)
@@ -0,0 +1,196 @@
+import os
+import shutil
+import hashlib
+import tempfile
+from collections import Counter
+
+# ioctl request that makes dest share source's blocks (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+def hash_file(path):
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def content_name(digest, path):
+    """Media file name for content with the given digest, keeping path's extension."""
+    ext = os.path.splitext(path)[1].lower()
+    return f"{digest[:16]}{ext}"
+
+def reflink(source, dest):
+    """Clone source into dest without copying data. Raises OSError where unsupported."""
+    import fcntl
+    with open(source, "rb") as src, open(dest, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(dest)
+            raise
+
+def clone_or_copy(source, dest):
+    """Put source's content at dest as cheaply as the filesystem allows.
+
+    Tries a reflink, then a plain copy. A reflink shares blocks copy-on-write,
+    so editing the source in place later leaves dest as it was. Hardlinks are
+    not an option: the author's original would then change the stored file
+    behind its content-hash name.
+    """
+    try:
+        reflink(source, dest)
+        return
+    except (ImportError, OSError):
+        pass
+    shutil.copyfile(source, dest)
+
+def iter_media_holders(modules):
+    """Yield every module, image section and quiz question dict that has an imgSrc."""
+    for module in modules:
+        if module.get("imgSrc"):
+            yield module
+        for topic in module.get("topics", []):
+            for section in topic.get("sections", []):
+                if section.get("type") == "image" and section.get("imgSrc"):
+                    yield section
+        for question in module.get("assessment") or []:
+            if question.get("imgSrc"):
+                yield question
+
+def iter_media_refs(modules):
+    """Yield every imgSrc referenced by modules, image sections and quiz questions."""
+    for holder in iter_media_holders(modules):
+        yield holder["imgSrc"]
+
+def media_refcounts(modules):
+    """Count how often each media file is referenced by imgSrc fields."""
+    return Counter(iter_media_refs(modules))
+
+class MediaPipeline:
+    """Downscales and re-encodes images as they are imported.
+
+    Images larger than max_dimension on either side are resized to fit, EXIF
+    and other metadata are dropped (the colour profile is kept), and the result
+    is written as format ("jpeg", "webp", "png" or None to keep the source
+    format) at the given quality. GIFs are left alone since they may be animated.
+    """
+    FORMATS = {"jpeg": (".jpg", "JPEG"), "webp": (".webp", "WEBP"), "png": (".png", "PNG")}
+    SOURCE_FORMATS = {".jpg": "jpeg", ".jpeg": "jpeg", ".webp": "webp", ".png": "png"}
+
+    def __init__(self, max_dimension=1600, format=None, quality=85):
+        if format is not None and format not in self.FORMATS:
+            raise ValueError(f"Unsupported image format: {format}")
+        self.max_dimension = max_dimension
+        self.format = format
+        self.quality = quality
+
+    def key(self):
+        return (self.max_dimension, self.format, self.quality)
+
+    def applies_to(self, path):
+        return os.path.splitext(path)[1].lower() in self.SOURCE_FORMATS
+
+    def output_format(self, path):
+        return self.format or self.SOURCE_FORMATS[os.path.splitext(path)[1].lower()]
+
+    def output_extension(self, path):
+        return self.FORMATS[self.output_format(path)][0]
+
+    def process(self, source_path, dest_path):
+        """Write the processed version of source_path to dest_path."""
+        from PIL import Image, ImageOps
+
+        pil_format = self.FORMATS[self.output_format(source_path)][1]
+        with Image.open(source_path) as img:
+            icc_profile = img.info.get("icc_profile")
+            # Apply the EXIF rotation before the EXIF data is dropped
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+
+            if pil_format == "JPEG" and img.mode not in ("RGB", "L"):
+                rgba = img.convert("RGBA")
+                img = Image.new("RGB", rgba.size, "white")
+                img.paste(rgba, mask=rgba.getchannel("A"))
+
+            options = {"icc_profile": icc_profile} if icc_profile else {}
+            if pil_format == "JPEG":
+                options.update(quality=self.quality, optimize=True, progressive=True)
+            elif pil_format == "WEBP":
+                options.update(quality=self.quality, method=4)
+            else:
+                options.update(optimize=True)
+            img.save(dest_path, format=pil_format, **options)
+
+def process_image(pipeline, source_path, dest_path):
+    """Run pipeline on one image and return (original size, processed size).
+
+    Module level so that it can be sent to a process pool.
+    """
+    pipeline.process(source_path, dest_path)
+    return os.path.getsize(source_path), os.path.getsize(dest_path)
+
+def store_processed(media_dir, processed_path):
+    """Move a processed image to its content-addressed name in media_dir."""
+    name = content_name(hash_file(processed_path), processed_path)
+    target = os.path.join(media_dir, name)
+    if os.path.exists(target):
+        os.remove(processed_path)
+    else:
+        os.replace(processed_path, target)
+    return name
+
+def optimize_media(module_set, pipeline, workers=None, progress=None):
+    """Run pipeline over every image the module set references, on a process pool.
+
+    References are repointed to the processed files; results that would not be
+    smaller are discarded. Returns a list of (name, original size, stored size).
+    """
+    names = sorted({name for name in iter_media_refs(module_set.modules) if pipeline.applies_to(name)})
+    jobs = []
+    for name in names:
+        path = module_set.media_path(name)
+        if path is not None:
+            fd, processed = tempfile.mkstemp(dir=os.path.dirname(path), suffix=pipeline.output_extension(name))
+            os.close(fd)
+            jobs.append((name, path, processed))
+
+    # Pulls in multiprocessing, which only the command line needs
+    from concurrent.futures import ProcessPoolExecutor
+
+    renamed = {}
+    report = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(process_image, pipeline, path, processed) for _, path, processed in jobs]
+            for done, ((name, path, processed), future) in enumerate(zip(jobs, futures), 1):
+                before, after = future.result()
+                if after < before:
+                    renamed[name] = store_processed(os.path.dirname(path), processed)
+                else:
+                    after = before
+                report.append((name, before, after))
+                if progress is not None:
+                    progress(done, len(jobs), name)
+    finally:
+        # Leftovers of results that were discarded or never finished
+        for _, _, processed in jobs:
+            if os.path.exists(processed):
+                os.remove(processed)
+
+    for holder in iter_media_holders(module_set.modules):
+        if holder["imgSrc"] in renamed:
+            holder["imgSrc"] = renamed[holder["imgSrc"]]
+    if renamed:
+        module_set.forget_saved_modules()
+    module_set.media_report.extend(report)
+    return report
+
+def format_report(report):
+    """Describe the bytes saved per asset and in total."""
+    lines = [f"{name}: {before} -> {after} bytes ({before - after} saved)" for name, before, after in report]
+    before = sum(entry[1] for entry in report)
+    after = sum(entry[2] for entry in report)
+    lines.append(f"Total: {before} -> {after} bytes ({before - after} saved)")
+    return "\n".join(lines)
@@ -0,0 +1,253 @@
+"""Typed in-memory model of a module set.
+
+Modules, topics, sections and quiz questions are slot dataclasses rather than
+free-form dicts: they take far less memory on large sets and the editor
+builds new items through the constructors here instead of ad hoc dicts.
+
+Every record also behaves like the dict it is saved as. r["imgSrc"], "imgSrc"
+in r, r.get() and r.pop() use the JSON keys, so core.ops paths, the journal
+and code that walks the module JSON work on either representation. Keys a
+class does not know are kept in extra and written back as they were. Fields
+that were absent from the loaded JSON hold MISSING and are left out again.
+
+uid is a process-wide id that stays the same while an item is moved around,
+for the UI to find items by; it is never saved.
+"""
+from dataclasses import dataclass, field
+from itertools import count
+
+class Missing:
+    """Marks a field that is absent from the JSON."""
+    __slots__ = ()
+
+    def __repr__(self):
+        return "MISSING"
+
+MISSING = Missing()
+
+next_uid = count(1).__next__
+
+class Record:
+    """Dict-style access to a slot dataclass by JSON key, see the module docstring."""
+    __slots__ = ("uid", "extra")
+    # JSON key -> attribute name, in the order the keys are written
+    FIELDS = {}
+    # JSON key -> function that turns loaded JSON into model objects
+    CHILDREN = {}
+
+    def __post_init__(self):
+        self.uid = next_uid()
+        self.extra = None
+
+    @classmethod
+    def from_dict(cls, data):
+        record = cls.__new__(cls)
+        children = cls.CHILDREN
+        found = 0
+        for key, attr in cls.FIELDS.items():
+            value = data.get(key, MISSING)
+            if value is not MISSING:
+                found += 1
+                if children and key in children:
+                    value = children[key](value)
+            setattr(record, attr, value)
+        record.uid = next_uid()
+        record.extra = None
+        if found < len(data):
+            record.extra = {key: value for key, value in data.items() if key not in cls.FIELDS}
+        return record
+
+    def as_json(self):
+        """Shallow dict of what is saved; nested records are left for json's default hook."""
+        data = {}
+        for key, attr in self.FIELDS.items():
+            value = getattr(self, attr)
+            if value is not MISSING:
+                data[key] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def to_dict(self):
+        """Deep copy of the record as plain JSON data."""
+        return plain(self)
+
+    def __getitem__(self, key):
+        attr = self.FIELDS.get(key)
+        if attr is None:
+            if self.extra is None:
+                raise KeyError(key)
+            return self.extra[key]
+        value = getattr(self, attr)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        attr = self.FIELDS.get(key)
+        if attr is not None:
+            setattr(self, attr, value)
+        elif self.extra is None:
+            self.extra = {key: value}
+        else:
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        attr = self.FIELDS.get(key)
+        if attr is None:
+            return self.extra is not None and key in self.extra
+        return getattr(self, attr) is not MISSING
+
+    def get(self, key, default=None):
+        attr = self.FIELDS.get(key)
+        if attr is None:
+            return default if self.extra is None else self.extra.get(key, default)
+        value = getattr(self, attr)
+        return default if value is MISSING else value
+
+    def pop(self, key, *default):
+        attr = self.FIELDS.get(key)
+        if attr is None:
+            if self.extra is None:
+                self.extra = {}
+            return self.extra.pop(key, *default)
+        value = getattr(self, attr)
+        if value is MISSING:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        setattr(self, attr, MISSING)
+        return value
+
+def json_default(obj):
+    """default= hook that lets json.dump() write model records."""
+    if isinstance(obj, Record):
+        return obj.as_json()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def plain(value):
+    """Convert records inside value to plain dicts."""
+    if isinstance(value, Record):
+        value = value.as_json()
+    if isinstance(value, dict):
+        return {key: plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [plain(item) for item in value]
+    return value
+
+@dataclass(slots=True, eq=False)
+class Question(Record):
+    question: str = ""
+    choices: dict = field(default_factory=lambda: {"a": "", "b": "", "c": "", "d": ""})
+    answer: str = ""
+    img_src: str = None
+    caption: str = ""
+    attribution: str = ""
+
+    FIELDS = {"question": "question", "choices": "choices", "answer": "answer",
+              "imgSrc": "img_src", "caption": "caption", "attribution": "attribution"}
+
+@dataclass(slots=True, eq=False)
+class Section(Record):
+    """Section of a type the editor does not know; its fields stay in extra."""
+    type: str = "content"
+
+    FIELDS = {"type": "type"}
+
+@dataclass(slots=True, eq=False)
+class TextSection(Section):
+    type: str = "text"
+    header: str = ""
+    content: str = ""
+
+    FIELDS = {"type": "type", "header": "header", "content": "content"}
+
+@dataclass(slots=True, eq=False)
+class ContentSection(Section):
+    """Trivia and remember sections."""
+    type: str = "trivia"
+    content: str = ""
+
+    FIELDS = {"type": "type", "content": "content"}
+
+@dataclass(slots=True, eq=False)
+class ListSection(Section):
+    type: str = "list"
+    category: str = "unordered"
+    has_header: bool = False
+    entries: list = field(default_factory=lambda: [""])
+
+    FIELDS = {"type": "type", "category": "category", "hasHeader": "has_header", "entries": "entries"}
+
+@dataclass(slots=True, eq=False)
+class ImageSection(Section):
+    type: str = "image"
+    img_src: str = None
+    caption: str = ""
+    attribution: str = ""
+
+    FIELDS = {"type": "type", "imgSrc": "img_src", "caption": "caption", "attribution": "attribution"}
+
+@dataclass(slots=True, eq=False)
+class RecallSection(Section):
+    type: str = "active-recall"
+    question: str = ""
+    answer: str = ""
+
+    FIELDS = {"type": "type", "question": "question", "answer": "answer"}
+
+SECTION_TYPES = {
+    "text": TextSection,
+    "list": ListSection,
+    "image": ImageSection,
+    "trivia": ContentSection,
+    "remember": ContentSection,
+    "active-recall": RecallSection,
+}
+
+def new_section(section_type):
+    """Return an empty section of a type picked in the editor."""
+    return SECTION_TYPES.get(section_type, ContentSection)(type=section_type)
+
+def section_from_dict(data):
+    return SECTION_TYPES.get(data.get("type"), Section).from_dict(data)
+
+@dataclass(slots=True, eq=False)
+class Topic(Record):
+    title: str = ""
+    sections: list = field(default_factory=list)
+
+    FIELDS = {"title": "title", "sections": "sections"}
+    CHILDREN = {"sections": lambda sections: [section_from_dict(section) for section in sections]}
+
+@dataclass(slots=True, eq=False)
+class Module(Record):
+    id: str = "0"
+    title: str = ""
+    img_src: str = None
+    topics: list = field(default_factory=list)
+    # A list of Questions once the module has a quiz
+    assessment: list = MISSING
+
+    FIELDS = {"id": "id", "title": "title", "imgSrc": "img_src", "topics": "topics", "assessment": "assessment"}
+    CHILDREN = {
+        "topics": lambda topics: [Topic.from_dict(topic) for topic in topics],
+        "assessment": lambda questions: [Question.from_dict(question) for question in questions],
+    }
+
+def modules_from_json(data):
+    """Build Modules from a list of loaded module JSON dicts."""
+    return [Module.from_dict(module) for module in data]
+
+def find_path(items, record, path=()):
+    """Return the core.ops path of record among items and their children, or None if it is not there."""
+    for index, item in enumerate(items):
+        if not isinstance(item, Record):
+            continue
+        if item.uid == record.uid:
+            return [*path, index]
+        for key in type(item).CHILDREN:
+            found = find_path(item.get(key) or [], record, (*path, index, key))
+            if found is not None:
+                return found
+    return None
@@ -0,0 +1,643 @@
+import os
+import re
+import json
+import shutil
+import tempfile
+import zipfile
+import zlib
+
+from core.archive import CompressionPolicy, compress_entry, copy_entry, ordered_map, write_raw_entry
+from core.export import ExportProfile
+from core.journal import JOURNAL_DIR, Journal, read_journal
+from core.media import clone_or_copy, content_name, hash_file, media_refcounts, store_processed
+from core.model import modules_from_json
+from core.ops import apply_ops
+from core.schema import format_problems, structural_problems, validate_modules
+
+MODULE_FILE_PATTERN = re.compile(r"^module_(\d+)\.json$")
+
+def module_number(filename):
+    """Return N for a module_N.json file name."""
+    return int(MODULE_FILE_PATTERN.match(filename).group(1))
+
+def stat_key(path):
+    """Cheap change signature of a file on disk."""
+    st = os.stat(path)
+    return (st.st_size, st.st_mtime_ns)
+
+def extract_entry(source, arcname, target_dir):
+    """Extract an entry of an open ZipFile unless it is already there.
+
+    The file only appears under its name once it is complete, since the Tk
+    thread may look for it at the same time.
+    """
+    path = os.path.join(target_dir, *arcname.split("/"))
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, partial = tempfile.mkstemp(dir=target_dir, suffix=".partial")
+    try:
+        with os.fdopen(fd, "wb") as dst, source.open(arcname) as src:
+            shutil.copyfileobj(src, dst)
+        os.replace(partial, path)
+    except BaseException:
+        os.remove(partial)
+        raise
+
+class OperationCancelled(Exception):
+    """Raised when an open or save is cancelled through its cancel_event."""
+
+class InvalidModuleSet(ValueError):
+    """Raised when module JSON is too malformed to load, with the structural core.schema Problems."""
+    def __init__(self, problems):
+        super().__init__(f"Not a valid module set:\n{format_problems(problems)}")
+        self.problems = problems
+
+class SavePlan:
+    """Entries a save will write, captured by ModuleSet.plan_save()."""
+    def __init__(self, zip_path, partial_path, jobs, source_archive, compression, lazy):
+        self.zip_path = zip_path
+        self.partial_path = partial_path
+        self.jobs = jobs
+        self.source_archive = source_archive
+        self.compression = compression
+        self.lazy = lazy
+        # (arcname, size) of unreferenced media left out of the archive
+        self.dropped = []
+        # Dropped entries that only exist in the source archive. An undo can
+        # bring their references back, so write_archive() extracts them into
+        # working_dir before the source archive may be replaced.
+        self.working_dir = None
+        self.extract = []
+        # Journal sequence number of the last change the plan contains
+        self.journal_seq = None
+        # What finish_save() records as saved: arcname -> uid of the module
+        # written there, the change count the modules are at and the JSON profile
+        self.module_uids = {}
+        self.change_count = 0
+        self.profile = None
+
+        # Filled in by write_archive()
+        self.entries = {}
+        self.rewritten = 0
+        self.reused = 0
+
+class ModuleSet:
+    """Modules and media of a module set, kept in a working directory.
+
+    This is the GUI-independent core behind App.open_file / App.save_file and
+    the command line, so nothing here may import tkinter or customtkinter.
+    """
+    def __init__(self, temp_dir=None):
+        # Only directories we created ourselves are removed on cleanup
+        self.owns_temp_dir = temp_dir is None
+        self.temp_dir = temp_dir or tempfile.mkdtemp(prefix="modulearn-maker_")
+        self.media_dir = None
+        self.modules = []
+        self.compression = CompressionPolicy()
+        self.export_profile = ExportProfile()
+
+        # Last archive opened or saved, and its entries by arcname as
+        # (ZipInfo, stat_key of the file it was written from). Entries that
+        # are unchanged since then are copied over on save without recompressing.
+        self.source_archive = None
+        self.source_archive_key = None
+        self.source_entries = {}
+        # Open handle on the source archive while media is read from it lazily
+        self.archive = None
+        # (path, size, mtime, pipeline) of imported files -> media name, so re-imports skip hashing
+        self.imported = {}
+        # Optional core.media.MediaPipeline applied to imported images
+        self.media_pipeline = None
+        # (name, original size, stored size) for every processed image
+        self.media_report = []
+        # Leave media that nothing references out of saved archives
+        self.drop_unused_media = True
+        # Crash-recovery log of apply()'d changes, see start_journal()
+        self.journal = None
+        # Called with the ops of every change made through apply()
+        self.listeners = []
+
+        # Which modules changed since the previous archive was written, so
+        # that plan_save() only encodes those: every apply() counts as one
+        # change, module_changes maps a module's uid to the last change that
+        # touched it, and saved_modules the previous archive's module_N.json
+        # names to the uid of the module they hold, as of saved_change_count
+        # and encoded with the export profile named saved_profile.
+        self.change_count = 0
+        self.module_changes = {}
+        self.saved_modules = {}
+        self.saved_change_count = 0
+        self.saved_profile = None
+
+    @classmethod
+    def from_directory(cls, path):
+        """Load an unpacked module set in place."""
+        module_set = cls(temp_dir=path)
+        module_set.load()
+        return module_set
+
+    @classmethod
+    def from_archive(cls, zip_path, temp_dir=None, lazy=False, progress=None, cancel_event=None):
+        """Open a zipped module set, see open()."""
+        module_set = cls(temp_dir=temp_dir)
+        try:
+            module_set.open(zip_path, lazy=lazy, progress=progress, cancel_event=cancel_event)
+        except Exception:
+            module_set.cleanup()
+            raise
+        return module_set
+
+    @classmethod
+    def recover(cls, temp_dir):
+        """Rebuild a module set from the journal an unclean exit left in temp_dir.
+
+        Media that was never extracted is read from the source archive again if
+        it is unchanged. The recovered set takes over the directory and its journal.
+        """
+        snapshot, changes = read_journal(temp_dir)
+        module_set = cls(temp_dir=temp_dir)
+        module_set.owns_temp_dir = True
+        # Replayed on the plain JSON, whose op values are plain JSON too
+        modules = snapshot["modules"]
+        for ops in changes:
+            apply_ops(modules, ops)
+        module_set.modules = modules_from_json(modules)
+
+        source = snapshot.get("source_archive")
+        key = snapshot.get("source_archive_key")
+        has_media = os.path.isdir(os.path.join(temp_dir, "media"))
+        if source and key and os.path.isfile(source) and stat_key(source) == tuple(key):
+            entries = module_set.attach_archive(source)
+            has_media = has_media or any(name.startswith("media/") for name in entries)
+        module_set.media_dir = os.path.join(temp_dir, "media") if has_media else None
+
+        module_set.start_journal(unsaved=True)
+        return module_set
+
+    def cleanup(self):
+        """Remove the working directory if it was created by this module set."""
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        self.close_archive()
+        if self.owns_temp_dir and self.temp_dir and os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+        self.temp_dir = None
+
+    def open(self, zip_path, lazy=False, progress=None, cancel_event=None):
+        """Open a zipped module set.
+
+        By default the whole archive is extracted into the working directory.
+        With lazy=True only the module JSON is parsed, straight from the archive;
+        media stays there until media_path() asks for it, and entries that were
+        never extracted are copied from the archive as-is on save.
+
+        progress(done, total, arcname) is called per extracted or parsed entry,
+        and setting cancel_event aborts with OperationCancelled.
+        """
+        self.close_archive()
+        if lazy:
+            self.open_lazy(zip_path, progress, cancel_event)
+            return
+
+        with zipfile.ZipFile(zip_path, "r") as zip_ref:
+            members = zip_ref.infolist()
+            entries = {}
+            for done, zinfo in enumerate(members, 1):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise OperationCancelled()
+                path = zip_ref.extract(zinfo, self.temp_dir)
+                if not zinfo.is_dir():
+                    entries[zinfo.filename] = (zinfo, stat_key(path))
+                if progress is not None:
+                    progress(done, len(members), zinfo.filename)
+        self.remember_archive(zip_path, entries)
+        self.load()
+
+    def open_lazy(self, zip_path, progress=None, cancel_event=None):
+        entries = self.attach_archive(zip_path)
+
+        module_files = sorted([name for name in entries if MODULE_FILE_PATTERN.match(name)], key=module_number)
+        modules = []
+        for done, name in enumerate(module_files, 1):
+            if cancel_event is not None and cancel_event.is_set():
+                raise OperationCancelled()
+            modules.append(json.loads(self.archive.read(name).decode("utf-8")))
+            if progress is not None:
+                progress(done, len(module_files), name)
+        self.set_modules_from_json(modules)
+
+        has_media = any(name.startswith("media/") for name in entries)
+        self.media_dir = os.path.join(self.temp_dir, "media") if has_media else None
+
+    def attach_archive(self, zip_path):
+        """Keep zip_path open as the source of entries that are not extracted yet."""
+        self.archive = zipfile.ZipFile(zip_path, "r")
+        entries = {zinfo.filename: (zinfo, None) for zinfo in self.archive.infolist() if not zinfo.is_dir()}
+        self.remember_archive(zip_path, entries)
+        return entries
+
+    def close_archive(self):
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+
+    def archive_only_entries(self):
+        """Return arcnames of lazily opened entries that were never extracted."""
+        if self.archive is None:
+            return []
+        return [
+            arcname for arcname, (_, key) in self.source_entries.items()
+            if key is None and not MODULE_FILE_PATTERN.match(arcname)
+            and not os.path.exists(os.path.join(self.temp_dir, *arcname.split("/")))
+        ]
+
+    def extract(self, arcname):
+        """Extract one entry of the lazily opened archive into the working directory."""
+        zinfo = self.source_entries[arcname][0]
+        path = self.archive.extract(zinfo, self.temp_dir)
+        self.source_entries[arcname] = (zinfo, stat_key(path))
+        return path
+
+    def media_path(self, name):
+        """Return the local path of a media file, or None if the set has no such file.
+
+        Files still inside a lazily opened archive are extracted on first use.
+        """
+        path = os.path.join(self.temp_dir, "media", name)
+        if os.path.isfile(path):
+            return path
+        arcname = f"media/{name}"
+        if self.archive is not None and arcname in self.source_entries:
+            return self.extract(arcname)
+        return None
+
+    def import_media(self, source_path):
+        """Add an image file to media/ and return the name to store in imgSrc.
+
+        Media is stored under a name derived from its content hash, so the same
+        image imported twice is stored once and different files that happen to
+        share a file name no longer overwrite each other. If media_pipeline is
+        set, the image is downscaled and re-encoded first when that makes it smaller.
+        """
+        pipeline = self.media_pipeline
+        st = os.stat(source_path)
+        source_key = (os.path.abspath(source_path), st.st_size, st.st_mtime_ns, pipeline and pipeline.key())
+        name = self.imported.get(source_key)
+
+        media_dir = self.media_dir or os.path.join(self.temp_dir, "media")
+        os.makedirs(media_dir, exist_ok=True)
+        self.media_dir = media_dir
+
+        if name is not None and self.has_media(name):
+            return name
+
+        if pipeline is not None and pipeline.applies_to(source_path):
+            fd, processed = tempfile.mkstemp(dir=media_dir, suffix=pipeline.output_extension(source_path))
+            os.close(fd)
+            try:
+                pipeline.process(source_path, processed)
+            except Exception:
+                os.remove(processed)
+                raise
+            stored_size = os.path.getsize(processed)
+            if stored_size < st.st_size:
+                name = store_processed(media_dir, processed)
+                self.media_report.append((os.path.basename(source_path), st.st_size, stored_size))
+                self.imported[source_key] = name
+                return name
+            os.remove(processed)
+
+        name = content_name(hash_file(source_path), source_path)
+        self.imported[source_key] = name
+        if not self.has_media(name):
+            clone_or_copy(source_path, os.path.join(media_dir, name))
+        return name
+
+    def has_media(self, name):
+        """Return True if a media file exists on disk or in the lazily opened archive."""
+        if os.path.isfile(os.path.join(self.temp_dir, "media", name)):
+            return True
+        return self.archive is not None and f"media/{name}" in self.source_entries
+
+    def remember_archive(self, zip_path, entries):
+        """Use zip_path as the source of unchanged entries on the next save."""
+        self.source_archive = os.path.abspath(zip_path)
+        self.source_archive_key = stat_key(zip_path)
+        self.source_entries = entries
+
+    def reusable_entries(self):
+        """Return the previous archive's entries if it is still as we left it."""
+        # The open handle pins the data lazily opened entries refer to
+        if self.archive is not None:
+            return self.source_entries
+        if not self.source_archive or not os.path.isfile(self.source_archive):
+            return {}
+        if stat_key(self.source_archive) != self.source_archive_key:
+            return {}
+        return self.source_entries
+
+    def forget_saved_modules(self):
+        """Serialize every module on the next save, after they were edited other than through apply()."""
+        self.saved_modules = {}
+
+    def is_module_changed(self, arcname, module):
+        """Return True if module may differ from what the previous archive has at arcname.
+
+        Modules are compared by the changes apply() made to them, without encoding them.
+        """
+        uid = getattr(module, "uid", None)
+        return (uid is None or self.saved_modules.get(arcname) != uid
+                or self.module_changes.get(uid, 0) > self.saved_change_count
+                or self.export_profile.name != self.saved_profile)
+
+    def is_module_dirty(self, arcname, data):
+        """Return True if serialized module data differs from the previous archive."""
+        previous = self.reusable_entries().get(arcname)
+        if previous is None or not self.matches_policy(previous[0]):
+            return True
+        zinfo = previous[0]
+        return zinfo.file_size != len(data) or zinfo.CRC != zlib.crc32(data)
+
+    def is_file_dirty(self, arcname, path):
+        """Return True if a media file changed since the previous archive was written."""
+        previous = self.reusable_entries().get(arcname)
+        if previous is None or not self.matches_policy(previous[0]):
+            return True
+        return previous[1] != stat_key(path)
+
+    def matches_policy(self, zinfo):
+        """Return True if an existing entry was compressed the way the policy wants."""
+        return zinfo.compress_type == self.compression.for_entry(zinfo.filename)[0]
+
+    def load(self):
+        """Load all module_N.json files in the working directory root."""
+        module_files = sorted([
+            f for f in os.listdir(self.temp_dir)
+            if MODULE_FILE_PATTERN.match(f) and os.path.isfile(os.path.join(self.temp_dir, f))
+        ], key=module_number)
+
+        modules = []
+        for file in module_files:
+            with open(os.path.join(self.temp_dir, file), "r", encoding="utf-8") as f:
+                modules.append(json.load(f))
+        self.set_modules_from_json(modules)
+
+        media_path = os.path.join(self.temp_dir, "media")
+        self.media_dir = media_path if os.path.isdir(media_path) else None
+
+    def set_modules_from_json(self, modules):
+        """Build the modules from loaded JSON, refusing JSON the model and editor cannot work with."""
+        problems = structural_problems(modules)
+        if problems:
+            raise InvalidModuleSet(problems)
+        self.modules = modules_from_json(modules)
+        # Until they are changed, modules are saved as the files they were loaded from
+        self.saved_modules = {f"module_{i}.json": module.uid for i, module in enumerate(self.modules)}
+        self.module_changes = {}
+        self.saved_change_count = self.change_count
+        self.saved_profile = self.export_profile.name
+
+    def module_jobs(self, reusable):
+        """Return the save jobs of the modules, see plan_save().
+
+        Only modules that changed since the previous archive are serialized.
+        """
+        jobs = []
+        for i, module in enumerate(self.modules):
+            arcname = f"module_{i}.json"
+            previous = reusable.get(arcname)
+            if previous is not None and not self.is_module_changed(arcname, module):
+                # Without a ZipInfo to reuse, write_archive() recompresses it from the source archive
+                jobs.append((arcname, None, None, None, previous[0] if self.matches_policy(previous[0]) else None))
+                continue
+            data = self.export_profile.encode(module)
+            reuse = None if self.is_module_dirty(arcname, data) else previous[0]
+            jobs.append((arcname, data, None, None, reuse))
+        return jobs
+
+    def file_entries(self, exclude=()):
+        """Yield (path, arcname) for every non-module file in the working directory."""
+        exclude = {os.path.abspath(path) for path in exclude}
+        for foldername, dirnames, filenames in os.walk(self.temp_dir):
+            if foldername == self.temp_dir and JOURNAL_DIR in dirnames:
+                dirnames.remove(JOURNAL_DIR)
+            for filename in filenames:
+                path = os.path.join(foldername, filename)
+                arcname = os.path.relpath(path, self.temp_dir).replace(os.sep, "/")
+                # Stale module files are replaced by the serialized modules
+                if arcname.endswith(".json") and "/" not in arcname:
+                    continue
+                if os.path.abspath(path) in exclude:
+                    continue
+                yield path, arcname
+
+    def save(self, zip_path, workers=1, progress=None, cancel_event=None):
+        """Write modules and media into a ZIP file.
+
+        Only modules and files that changed since the last open or save are
+        compressed again; everything else is copied from the previous archive
+        as-is. With workers > 1 entries are compressed on a thread pool and
+        written in order. Media no module references is left out unless
+        drop_unused_media is False, but stays in the working directory for
+        undo. Returns the finished SavePlan, which has the rewritten/reused
+        counts and the dropped media.
+        """
+        plan = self.plan_save(zip_path)
+        self.write_archive(plan, workers, progress, cancel_event)
+        fold = self.finish_save(plan)
+        if fold is not None:
+            fold()
+        return plan
+
+    def plan_save(self, zip_path):
+        """Snapshot what a save has to write and which unused media it drops.
+
+        Run this on the thread that edits the modules; write_archive() can then
+        run on a worker thread while editing continues.
+        """
+        partial_path = zip_path + ".partial"
+        reusable = self.reusable_entries()
+
+        # One pass over the module graph counts the references to each media file
+        refcounts = media_refcounts(self.modules)
+        dropped = []
+        extract = []
+
+        def unused(arcname):
+            return self.drop_unused_media and arcname.startswith("media/") and not refcounts[arcname[len("media/"):]]
+
+        # (arcname, data, path, stat_key, ZipInfo to reuse or None)
+        jobs = self.module_jobs(reusable)
+        for path, arcname in self.file_entries(exclude=[zip_path, partial_path]):
+            if unused(arcname):
+                dropped.append((arcname, os.path.getsize(path)))
+                continue
+            reuse = None if self.is_file_dirty(arcname, path) else reusable[arcname][0]
+            jobs.append((arcname, None, path, stat_key(path), reuse))
+        for arcname in self.archive_only_entries():
+            if unused(arcname):
+                dropped.append((arcname, self.source_entries[arcname][0].file_size))
+                extract.append(arcname)
+                continue
+            zinfo = reusable[arcname][0]
+            # Without a ZipInfo to reuse, write_archive() recompresses it from the source archive
+            jobs.append((arcname, None, None, None, zinfo if self.matches_policy(zinfo) else None))
+
+        source_archive = self.source_archive if reusable else None
+        plan = SavePlan(zip_path, partial_path, jobs, source_archive, self.compression, lazy=self.archive is not None)
+        plan.dropped = dropped
+        plan.working_dir = self.temp_dir
+        plan.extract = extract
+        if self.journal is not None:
+            plan.journal_seq = self.journal.seq
+        plan.module_uids = {f"module_{i}.json": getattr(module, "uid", None) for i, module in enumerate(self.modules)}
+        plan.change_count = self.change_count
+        plan.profile = self.export_profile.name
+        return plan
+
+    def write_archive(self, plan, workers=1, progress=None, cancel_event=None):
+        """Write the planned entries into plan.partial_path.
+
+        Safe to run on a worker thread: it only reads the plan, files on disk
+        and its own handle on the source archive, and writes nothing into the
+        working directory but the dropped media in plan.extract.
+        progress(done, total, arcname) is called after every entry, and
+        setting cancel_event aborts with OperationCancelled.
+        """
+        def compress(job):
+            arcname, data, path, _, reuse = job
+            if reuse is not None:
+                return None
+            return compress_entry(arcname, plan.compression, data=data, path=path)
+
+        def read_sources(jobs):
+            # Unchanged modules and entries only in the source archive whose
+            # compression no longer matches the policy; read here, one at a
+            # time as the pool asks for them
+            for job in jobs:
+                arcname, data, path, key, reuse = job
+                if reuse is None and data is None and path is None:
+                    job = (arcname, source.read(arcname), None, key, None)
+                yield job
+
+        source = zipfile.ZipFile(plan.source_archive, "r") if plan.source_archive else None
+        total = len(plan.jobs)
+
+        try:
+            with zipfile.ZipFile(plan.partial_path, "w") as zipf:
+                results = ordered_map(compress, read_sources(plan.jobs), workers)
+                for done, (job, result) in enumerate(zip(plan.jobs, results), 1):
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise OperationCancelled()
+                    arcname, _, _, key, reuse = job
+                    if result is None:
+                        zinfo = copy_entry(source, reuse, zipf)
+                        plan.reused += 1
+                    else:
+                        zinfo = write_raw_entry(zipf, *result)
+                        plan.rewritten += 1
+                    plan.entries[arcname] = (zinfo, key)
+                    if progress is not None:
+                        progress(done, total, arcname)
+            for arcname in plan.extract:
+                extract_entry(source, arcname, plan.working_dir)
+        except BaseException:
+            if os.path.exists(plan.partial_path):
+                os.remove(plan.partial_path)
+            raise
+        finally:
+            if source is not None:
+                source.close()
+
+    def finish_save(self, plan):
+        """Move the written archive into place and make it the source for the next save.
+
+        Returns the journal fold that records the save, see compact_journal(),
+        or None without a journal.
+        """
+        self.close_archive()
+        os.replace(plan.partial_path, plan.zip_path)
+        self.remember_archive(plan.zip_path, plan.entries)
+        # Changes made while the archive was written count as unsaved
+        self.saved_modules = plan.module_uids
+        self.saved_change_count = plan.change_count
+        self.saved_profile = plan.profile
+        self.module_changes = {uid: count for uid, count in self.module_changes.items() if count > plan.change_count}
+        if plan.lazy:
+            # Entries that were never extracted now live in the new archive
+            self.archive = zipfile.ZipFile(plan.zip_path, "r")
+        if self.journal is not None:
+            # Changes made while the archive was written are still unsaved
+            saved = self.journal.seq == plan.journal_seq
+            return self.compact_journal(saved=saved)
+        return None
+
+    def apply(self, ops):
+        """Apply a change, a list of core.ops ops, and return the ops that revert it.
+
+        Changes are written to the journal, if one was started, and passed on
+        to the listeners.
+        """
+        # Module indices before the change, if it moves modules around
+        order = [getattr(module, "uid", None) for module in self.modules] if any(len(path) == 1 for _, path, _ in ops) else None
+        applied, inverse = apply_ops(self.modules, ops)
+        if applied:
+            self.note_changes(applied, order)
+            if self.journal is not None:
+                self.journal.append(applied)
+            for listener in self.listeners:
+                listener(applied)
+        return inverse
+
+    def note_changes(self, applied, order):
+        """Record the modules applied ops changed, by uid, see is_module_changed().
+
+        order is the uid of every module before the change, to follow indices
+        through ops that insert, delete or replace modules. Modules those ops
+        move or add need no record: they are no longer at the arcname they
+        were saved as.
+        """
+        self.change_count += 1
+        for kind, path, value in applied:
+            if len(path) > 1:
+                uid = order[path[0]] if order is not None else getattr(self.modules[path[0]], "uid", None)
+                self.module_changes[uid] = self.change_count
+            elif kind == "insert":
+                order.insert(path[0], getattr(value, "uid", None))
+            elif kind == "delete":
+                order.pop(path[0])
+            else:
+                order[path[0]] = getattr(value, "uid", None)
+
+    def start_journal(self, unsaved=False):
+        """Journal changes made through apply() in the working directory, see core.journal."""
+        self.journal = Journal(self.temp_dir)
+        self.journal.start(self.modules, self.journal_state(), unsaved=unsaved)
+
+    def journal_state(self):
+        """What a recovery needs besides the modules."""
+        key = self.source_archive_key
+        return {"source_archive": self.source_archive, "source_archive_key": list(key) if key else None}
+
+    def compact_journal(self, saved=False):
+        """Start a new journal log and return a function that folds the old one into the snapshot.
+
+        Only the log is switched here. The returned function replays it onto
+        the last snapshot without looking at the modules, so it can run on a
+        worker thread while editing goes on. Returns None if there is nothing
+        to fold, see core.journal.
+        """
+        journal = self.journal
+        if journal is None or not (journal.pending or saved):
+            return None
+        header = journal.rotate(self.journal_state(), saved=saved)
+        return lambda: journal.fold(header)
+
+    def has_unsaved_changes(self):
+        return self.journal is not None and self.journal.unsaved
+
+    def validate(self):
+        """Return the core.schema Problems that would break the set in ModuLearn."""
+        return validate_modules(self.modules, has_media=self.has_media)
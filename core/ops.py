@@ -0,0 +1,77 @@
+"""Path-addressed edits of the module list.
+
+Every change the editor makes to ModuleSet.modules is expressed as a list of
+ops, so it can be written to the journal and reverted. An op is a list
+[kind, path, value] where path is a list of dict keys and list indices
+starting at the module list:
+
+    ["set", path, value]     set a dict key or replace a list item
+    ["unset", path, None]    remove a dict key
+    ["insert", path, value]  insert value into a list before index path[-1]
+    ["delete", path, None]   remove the list item at index path[-1]
+
+Values are stored by reference, so editors that keep a dict of the model keep
+working on the same object after it is inserted, deleted and inserted again.
+"""
+
+def set_op(path, value):
+    return ["set", list(path), value]
+
+def unset_op(path):
+    return ["unset", list(path), None]
+
+def insert_op(path, value):
+    return ["insert", list(path), value]
+
+def delete_op(path):
+    return ["delete", list(path), None]
+
+def resolve(modules, path):
+    """Return the container holding path[-1]."""
+    node = modules
+    for key in path[:-1]:
+        node = node[key]
+    return node
+
+def apply_op(modules, op):
+    """Apply one op and return the op that reverts it, or None if nothing changed."""
+    kind, path, value = op
+    parent = resolve(modules, path)
+    key = path[-1]
+
+    if kind == "set":
+        if not isinstance(parent, list) and key not in parent:
+            parent[key] = value
+            return unset_op(path)
+        old = parent[key]
+        # Only scalars are compared, comparing nested dicts would cost as much as the edit saves
+        if old is value or (not isinstance(value, (dict, list)) and type(old) is type(value) and old == value):
+            return None
+        parent[key] = value
+        return set_op(path, old)
+    if kind == "unset":
+        if key not in parent:
+            return None
+        return set_op(path, parent.pop(key))
+    if kind == "insert":
+        parent.insert(key, value)
+        return delete_op(path)
+    if kind == "delete":
+        return insert_op(path, parent.pop(key))
+    raise ValueError(f"Unknown edit op: {kind!r}")
+
+def apply_ops(modules, ops):
+    """Apply ops in order.
+
+    Returns (applied, inverse): the ops that changed something, and the ops
+    that revert them, in the order they have to be applied.
+    """
+    applied = []
+    inverse = []
+    for op in ops:
+        undo = apply_op(modules, op)
+        if undo is not None:
+            applied.append(op)
+            inverse.append(undo)
+    inverse.reverse()
+    return applied, inverse
@@ -0,0 +1,248 @@
+"""Structural validation of module sets.
+
+The schema below is put together once, at import, out of small closures:
+validating a module is a chain of plain function calls with no schema
+lookups on the way. Validators take (value, path, ctx). path is a linked
+(parent, key) pair that is only flattened when a problem is reported, so
+walking a valid set allocates next to nothing.
+
+Problems are structural when the editor cannot load the module at all: an
+item that is not an object, a list of items that is not a list, or a title
+missing. The rest, including text fields of the wrong type, only matter to
+ModuLearn.
+
+Modules can be plain dicts or core.model records.
+"""
+from core.model import MISSING, Record
+
+class Problem:
+    """A validation error at path, a tuple of keys and indices starting at the module index."""
+    __slots__ = ("path", "message", "structural")
+
+    def __init__(self, path, message, structural=False):
+        self.path = path
+        self.message = message
+        self.structural = structural
+
+    def __str__(self):
+        return f"{format_path(self.path)}: {self.message}"
+
+    def __repr__(self):
+        return f"Problem({self.path!r}, {self.message!r})"
+
+def format_path(path):
+    """Render a path as module_N.json: topics[2].sections[0].type."""
+    text = f"module_{path[0]}.json"
+    rest = ""
+    for key in path[1:]:
+        rest += f"[{key}]" if isinstance(key, int) else f".{key}" if rest else key
+    return f"{text}: {rest}" if rest else text
+
+def flatten(path):
+    keys = []
+    while path is not None:
+        path, key = path
+        keys.append(key)
+    keys.reverse()
+    return tuple(keys)
+
+class Validation:
+    """State of one validation run: the problems found and the media lookup."""
+    def __init__(self, has_media=None):
+        self.problems = []
+        self.has_media = has_media
+        self.media_cache = {}
+
+    def report(self, path, message, structural=False):
+        self.problems.append(Problem(flatten(path), message, structural))
+
+    def media_exists(self, name):
+        exists = self.media_cache.get(name)
+        if exists is None:
+            exists = self.media_cache[name] = self.has_media(name)
+        return exists
+
+def string(non_empty=False, nullable=False):
+    def check(value, path, ctx):
+        if type(value) is str:
+            if non_empty and not value.strip():
+                ctx.report(path, "must not be empty")
+        elif not (nullable and value is None):
+            ctx.report(path, f"expected text, got {type(value).__name__}")
+    if not non_empty:
+        check.valid_type = str
+    return check
+
+def boolean():
+    def check(value, path, ctx):
+        if type(value) is not bool:
+            ctx.report(path, f"expected true or false, got {type(value).__name__}")
+    check.valid_type = bool
+    return check
+
+def one_of(*allowed):
+    allowed = frozenset(allowed)
+    def check(value, path, ctx):
+        if value not in allowed:
+            ctx.report(path, f"must be one of {', '.join(sorted(allowed))}, got {value!r}")
+    return check
+
+def media(required=False):
+    """An imgSrc: a media file name that has to exist in the set."""
+    check_name = string(nullable=not required)
+    def check(value, path, ctx):
+        if value is None and not required:
+            return
+        if type(value) is not str:
+            check_name(value, path, ctx)
+        elif not value:
+            ctx.report(path, "no image selected")
+        elif ctx.has_media is not None and not ctx.media_exists(value):
+            ctx.report(path, f"media/{value} is referenced but missing")
+    return check
+
+def list_of(check_item):
+    def check(value, path, ctx):
+        if type(value) is not list:
+            ctx.report(path, f"expected a list, got {type(value).__name__}", structural=True)
+            return
+        for i, item in enumerate(value):
+            check_item(item, (path, i), ctx)
+    return check
+
+def mapping_of(check_value):
+    def check(value, path, ctx):
+        if type(value) is not dict:
+            ctx.report(path, f"expected an object, got {type(value).__name__}", structural=True)
+            return
+        for key, item in value.items():
+            check_value(item, (path, key), ctx)
+    return check
+
+def record(fields, required=(), structural=(), rules=()):
+    """An object with the given field validators.
+
+    Fields in required must be present, and a missing field in structural is
+    a structural problem. rules are called as rule(value, path, ctx) for
+    checks across fields, once the fields themselves are valid. Validators
+    with a valid_type are skipped for values of exactly that type.
+    """
+    fields = tuple((key, check_field, getattr(check_field, "valid_type", None)) for key, check_field in fields.items())
+    structural = frozenset(structural)
+    required = frozenset(required) | structural
+    # Record class -> attribute name of each field, or None for keys it keeps in extra
+    attributes = {}
+
+    def check(value, path, ctx):
+        if isinstance(value, Record):
+            attrs = attributes.get(type(value))
+            if attrs is None:
+                attrs = attributes[type(value)] = tuple(value.FIELDS.get(key) for key, _, _ in fields)
+        elif isinstance(value, dict):
+            attrs = (None,) * len(fields)
+        else:
+            ctx.report(path, f"expected an object, got {type(value).__name__}", structural=True)
+            return
+        get = value.get
+        count = len(ctx.problems)
+        for (key, check_field, valid_type), attr in zip(fields, attrs):
+            item = get(key, MISSING) if attr is None else getattr(value, attr)
+            if type(item) is valid_type:
+                continue
+            if item is MISSING:
+                if key in required:
+                    ctx.report((path, key), "missing", structural=key in structural)
+            else:
+                check_field(item, (path, key), ctx)
+        if len(ctx.problems) == count:
+            for rule in rules:
+                rule(value, path, ctx)
+    return check
+
+def tagged(tag, variants):
+    """An object whose tag field picks which of the variants validates it."""
+    names = ", ".join(sorted(variants))
+    def check(value, path, ctx):
+        if not isinstance(value, (dict, Record)):
+            ctx.report(path, f"expected an object, got {type(value).__name__}", structural=True)
+            return
+        kind = value.get(tag, MISSING)
+        if kind is MISSING:
+            ctx.report((path, tag), "missing")
+            return
+        variant = variants.get(kind) if type(kind) is str else None
+        if variant is None:
+            # The model looks sections up by their tag, which has to be hashable for that
+            ctx.report((path, tag), f"unknown {tag} {kind!r}, expected one of {names}", structural=isinstance(kind, (list, dict)))
+            return
+        variant(value, path, ctx)
+    return check
+
+def answer_in_choices(question, path, ctx):
+    answer = question.get("answer")
+    if not answer:
+        ctx.report((path, "answer"), "no answer selected")
+    elif answer not in question.get("choices", {}):
+        ctx.report((path, "answer"), f"{answer!r} is not one of the choices")
+
+TEXT = string()
+TITLE = string(non_empty=True)
+
+# One per type in core.model.SECTION_TYPES
+SECTIONS = {
+    "text": record({"type": TEXT, "header": TEXT, "content": TEXT}, required=("content",)),
+    "list": record({
+        "type": TEXT,
+        "category": one_of("unordered", "ordered"),
+        "hasHeader": boolean(),
+        "entries": list_of(TEXT),
+    }, required=("entries",)),
+    "image": record({"type": TEXT, "imgSrc": media(required=True), "caption": TEXT, "attribution": TEXT}, required=("imgSrc",)),
+    "trivia": record({"type": TEXT, "content": TEXT}, required=("content",)),
+    "remember": record({"type": TEXT, "content": TEXT}, required=("content",)),
+    "active-recall": record({"type": TEXT, "question": TEXT, "answer": TEXT}, required=("question", "answer")),
+}
+
+QUESTION = record({
+    "question": TITLE,
+    "choices": mapping_of(TEXT),
+    "answer": TEXT,
+    "imgSrc": media(),
+    "caption": TEXT,
+    "attribution": TEXT,
+}, required=("question", "choices", "answer"), rules=(answer_in_choices,))
+
+TOPIC = record({
+    "title": TITLE,
+    "sections": list_of(tagged("type", SECTIONS)),
+}, structural=("title",))
+
+MODULE = record({
+    "id": TEXT,
+    "title": TITLE,
+    "imgSrc": media(),
+    "topics": list_of(TOPIC),
+    "assessment": list_of(QUESTION),
+}, structural=("title",))
+
+def validate_modules(modules, has_media=None):
+    """Return the Problems of a module list, in module order.
+
+    has_media(name) tells whether an imgSrc exists; without it media
+    references are not checked.
+    """
+    ctx = Validation(has_media)
+    for i, module in enumerate(modules):
+        MODULE(module, (None, i), ctx)
+    return ctx.problems
+
+def structural_problems(modules):
+    """Return the structural Problems of loaded module JSON, see the module docstring."""
+    return [problem for problem in validate_modules(modules) if problem.structural]
+
+def format_problems(problems, limit=10):
+    """One problem per line, at most limit of them."""
+    lines = [str(problem) for problem in problems[:limit]]
+    if len(problems) > limit:
+        lines.append(f"... and {len(problems) - limit} more")
+    return "\n".join(lines)
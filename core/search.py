@@ -0,0 +1,376 @@
+"""Full-text search over a module list.
+
+SearchIndex is an inverted index from words to the modules, topics, sections
+and quiz questions they appear in. Each of those items is one document,
+indexed under its uid. The index is kept current from the ops that
+ModuleSet.apply() passes to its listeners, see core.ops:
+- A text edit re-indexes only the item it changed.
+- Inserting, deleting or replacing items only compares the one list they are in.
+
+Queries look up every word of the query as a prefix in a sorted word list and
+intersect the posting sets smallest first, so they cost about as much as the
+rarest word has matches, however large the set is.
+"""
+import re
+from bisect import bisect_left
+
+from core.model import (ContentSection, ImageSection, ListSection, Module, Question,
+                        RecallSection, Record, TextSection, Topic)
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# JSON keys holding the searchable text of each record type
+TEXT_KEYS = {
+    Module: ("title",),
+    Topic: ("title",),
+    TextSection: ("header", "content"),
+    ContentSection: ("content",),
+    ListSection: ("entries",),
+    ImageSection: ("caption",),
+    RecallSection: ("question", "answer"),
+    Question: ("question", "choices"),
+}
+
+def record_text(record):
+    """The searchable text of a record, one field or entry per line."""
+    parts = []
+    for key in TEXT_KEYS.get(type(record), ()):
+        value = record.get(key)
+        if isinstance(value, dict):
+            value = list(value.values())
+        if isinstance(value, list):
+            parts.extend(item for item in value if isinstance(item, str))
+        elif isinstance(value, str):
+            parts.append(value)
+    return "\n".join(parts)
+
+def words(text):
+    return set(WORD_PATTERN.findall(text.casefold()))
+
+def snippet(text, query, width=60):
+    """One line of text around the first word of query, for showing a hit."""
+    text = " ".join(text.split())
+    terms = WORD_PATTERN.findall(query.casefold())
+    start = text.casefold().find(terms[0]) if terms else -1
+    if start <= width // 4:
+        return text[:width] + ("…" if len(text) > width else "")
+    start -= width // 4
+    return "…" + text[start:start + width] + ("…" if start + width < len(text) else "")
+
+class Entry:
+    """An indexed record, where it sits and the words it was indexed under."""
+    __slots__ = ("record", "parent", "field", "words")
+
+    def __init__(self, record, parent, field, words):
+        self.record = record
+        # Record whose field list holds this one, None for a module
+        self.parent = parent
+        self.field = field
+        self.words = words
+
+class Hit:
+    """A search result: the matching record and its core.ops path."""
+    __slots__ = ("path", "record")
+
+    def __init__(self, path, record):
+        self.path = path
+        self.record = record
+
+    def __repr__(self):
+        return f"Hit({self.path!r}, {type(self.record).__name__})"
+
+class SearchIndex:
+    """Inverted index over the text of a module list.
+
+    The index is built on the first search rather than up front; update()
+    has to be called with every change applied to the modules after that.
+    Large sets can be built on another thread instead: begin_build(), then
+    build() there, then finish_build() back on the thread that edits the
+    modules. Changes passed to update() in the meantime are caught up on
+    from the records as they are by then, so the build may see some of them
+    or none.
+    """
+    # Shorter query words only match whole words, a one letter prefix matches nearly everything
+    MIN_PREFIX = 3
+    # Words added since the vocabulary was sorted that a query scans one by one
+    MAX_NEW_WORDS = 256
+
+    def __init__(self, modules):
+        self.modules = modules
+        self.built = False
+        # uid -> Entry
+        self.entries = {}
+        # word -> set of uids
+        self.postings = {}
+        # Words for prefix lookups: vocabulary is sorted, words added since it
+        # was sorted wait in new_words, and stale words are still in vocabulary
+        # but no longer in postings. Both are folded in once they pile up.
+        self.vocabulary = []
+        self.new_words = []
+        self.stale = set()
+        # (parent uid or None, field) -> uids of the records in that list
+        self.children = {}
+        # What update() saw change while build() runs on another thread, or None
+        self.pending = None
+
+    def build(self):
+        self.entries.clear()
+        self.postings.clear()
+        self.children.clear()
+        # Lists are copied before they are walked, so what is indexed matches
+        # self.children even if another thread edits them meanwhile
+        modules = list(self.modules)
+        for module in modules:
+            self.add(module, None, None)
+        self.children[(None, None)] = {module.uid for module in modules if isinstance(module, Record)}
+        self.sort_vocabulary()
+        self.built = True
+
+    def sort_vocabulary(self):
+        self.vocabulary = sorted(self.postings)
+        self.new_words = []
+        self.stale = set()
+
+    def ensure_built(self):
+        if not self.built:
+            self.build()
+
+    def is_ready(self):
+        """False while a build on another thread has not been finished."""
+        return self.pending is None
+
+    def begin_build(self):
+        """Queue what update() is given until finish_build(), so build() can run on another thread."""
+        self.pending = []
+
+    def finish_build(self):
+        """Catch up with the changes queued since begin_build(), once build() returned."""
+        pending, self.pending = self.pending, None
+        # After a failed build the next search builds the index from scratch
+        if self.built:
+            self.catch_up(pending or [])
+
+    def add(self, record, parent, field):
+        """Index record and everything below it."""
+        if not isinstance(record, Record):
+            return
+        uid = record.uid
+        moved = self.entries.get(uid)
+        if moved is not None:
+            self.remove_words(uid, moved.words)
+        entry = Entry(record, parent, field, words(record_text(record)))
+        self.entries[uid] = entry
+        self.add_words(uid, entry.words)
+        for key in type(record).CHILDREN:
+            items = list(record.get(key) or [])
+            for item in items:
+                self.add(item, record, key)
+            if items:
+                self.children[(uid, key)] = {item.uid for item in items if isinstance(item, Record)}
+
+    def remove(self, uid, parent_uid, field):
+        """Drop the record uid and everything below it from the index.
+
+        Records that were moved to another list in the meantime are left alone.
+        """
+        entry = self.entries.get(uid)
+        if entry is None or entry.field != field or (entry.parent.uid if entry.parent else None) != parent_uid:
+            return
+        del self.entries[uid]
+        self.remove_words(uid, entry.words)
+        for key in type(entry.record).CHILDREN:
+            for child in self.children.pop((uid, key), ()):
+                self.remove(child, uid, key)
+
+    def add_words(self, uid, new_words):
+        postings = self.postings
+        get = postings.get
+        for word in new_words:
+            uids = get(word)
+            if uids is not None:
+                uids.add(uid)
+            else:
+                postings[word] = {uid}
+                if self.built:
+                    if word in self.stale:
+                        self.stale.discard(word)
+                    else:
+                        self.new_words.append(word)
+        if len(self.new_words) > self.MAX_NEW_WORDS:
+            self.vocabulary += self.new_words
+            self.vocabulary.sort()
+            self.new_words = []
+
+    def remove_words(self, uid, old_words):
+        postings = self.postings
+        for word in old_words:
+            uids = postings[word]
+            uids.discard(uid)
+            if not uids:
+                del postings[word]
+                self.stale.add(word)
+        if len(self.stale) > len(self.vocabulary) // 4 + self.MAX_NEW_WORDS:
+            self.sort_vocabulary()
+
+    def reindex(self, record):
+        entry = self.entries.get(record.uid)
+        if entry is None:
+            return
+        new_words = words(record_text(record))
+        self.remove_words(record.uid, entry.words - new_words)
+        self.add_words(record.uid, new_words - entry.words)
+        entry.words = new_words
+
+    def sync_list(self, parent, field, items):
+        """Bring the index in line with the records now in a list of parent's."""
+        parent_uid = parent.uid if parent is not None else None
+        key = (parent_uid, field)
+        old = self.children.get(key, set())
+        current = {item.uid: item for item in items if isinstance(item, Record)}
+        for uid in old - current.keys():
+            self.remove(uid, parent_uid, field)
+        for uid, item in current.items():
+            if uid not in old or uid not in self.entries:
+                self.add(item, parent, field)
+        if current:
+            self.children[key] = set(current)
+        else:
+            self.children.pop(key, None)
+
+    def update(self, ops):
+        """Re-index what ops, as passed to ModuleSet.listeners, changed."""
+        if self.pending is not None:
+            self.pending += self.changed(ops)
+        elif self.built:
+            self.catch_up(self.changed(ops))
+
+    def changed(self, ops):
+        """Return (record, field) for what each op changed.
+
+        field is the list of record's that the op changed, or None if it
+        changed record's own text; record None stands for the module list.
+        Paths are resolved against the modules as they are now.
+        """
+        changed = []
+        for _, path, _ in ops:
+            # Find the innermost record above the changed key
+            node = self.modules
+            owner = None
+            depth = 0
+            try:
+                for i, key in enumerate(path[:-1]):
+                    node = node[key]
+                    if isinstance(node, Record):
+                        owner = node
+                        depth = i + 1
+            except (KeyError, IndexError, TypeError):
+                # A later op in the same change removed part of the path; it re-indexes that itself
+                pass
+
+            if owner is None:
+                changed.append((None, None))
+            elif path[depth] in type(owner).CHILDREN:
+                changed.append((owner, path[depth]))
+            else:
+                changed.append((owner, None))
+        return changed
+
+    def catch_up(self, changed):
+        """Bring the index in line with the records and lists changed() found."""
+        for owner, field in changed:
+            if owner is None:
+                self.sync_list(None, None, self.modules)
+            elif owner.uid not in self.entries:
+                # Not indexed yet; syncing the list it was added to indexes it as it is now
+                continue
+            elif field is not None:
+                self.sync_list(owner, field, owner.get(field) or [])
+            else:
+                self.reindex(owner)
+
+    def expand(self, term):
+        """Posting sets of the words term matches."""
+        if len(term) < self.MIN_PREFIX:
+            uids = self.postings.get(term)
+            return [uids] if uids else []
+        postings = self.postings
+        vocabulary = self.vocabulary
+        sets = []
+        i = bisect_left(vocabulary, term)
+        while i < len(vocabulary) and vocabulary[i].startswith(term):
+            uids = postings.get(vocabulary[i])
+            if uids:
+                sets.append(uids)
+            i += 1
+        for word in self.new_words:
+            if word.startswith(term) and word in postings:
+                sets.append(postings[word])
+        return sets
+
+    def search(self, query, limit=50):
+        """Return the first limit Hits of records containing every word of query, in module order.
+
+        Each query word matches the words it is a prefix of.
+        """
+        self.ensure_built()
+        groups = []
+        for term in words(query):
+            sets = self.expand(term)
+            if not sets:
+                return []
+            groups.append(sets)
+        if not groups:
+            return []
+
+        # Walk the term with the fewest matches and look the rest up
+        groups.sort(key=lambda sets: sum(map(len, sets)))
+        rest = [sets[0] if len(sets) == 1 else set().union(*sets) for sets in groups[1:]]
+        found = set()
+        for uids in groups[0]:
+            for uid in uids:
+                if uid not in found and all(uid in other for other in rest):
+                    found.add(uid)
+
+        if len(found) > limit:
+            # Finding every match's path would cost more than walking the set up to the limit-th match
+            return self.first_hits(found, limit)
+        positions = {module.uid: i for i, module in enumerate(self.modules) if isinstance(module, Record)}
+        hits = [Hit(self.path(uid, positions), self.entries[uid].record) for uid in found]
+        # Topics come before the quiz, as in the sidebar
+        hits.sort(key=lambda hit: [key if type(key) is int else key == "assessment" for key in hit.path])
+        return hits
+
+    def first_hits(self, uids, limit):
+        """Return Hits for the first limit of uids in module order, walking the modules."""
+        hits = []
+
+        def walk(items, path):
+            for i, item in enumerate(items):
+                if not isinstance(item, Record):
+                    continue
+                if item.uid in uids:
+                    hits.append(Hit(path + [i], item))
+                    if len(hits) == limit:
+                        return True
+                # CHILDREN lists a module's topics before its quiz, as the sidebar shows them
+                for key in type(item).CHILDREN:
+                    if walk(item.get(key) or [], path + [i, key]):
+                        return True
+            return False
+
+        walk(self.modules, [])
+        return hits
+
+    def path(self, uid, positions=None):
+        """The core.ops path of an indexed record, e.g. [2, "topics", 0, "sections", 5].
+
+        positions maps module uids to their index, for looking up many paths at once.
+        """
+        entry = self.entries[uid]
+        path = []
+        while entry.parent is not None:
+            path += [entry.parent[entry.field].index(entry.record), entry.field]
+            entry = self.entries[entry.parent.uid]
+        path.append(positions[entry.record.uid] if positions is not None else self.modules.index(entry.record))
+        path.reverse()
+        return path
@@ -1,15 +1,42 @@
-import sys, os
-import json
-import tempfile
-import zipfile
-import shutil
+import sys, os, shutil, time
+
+# First, so that the startup profile covers every import below
+from ui.startup import StartupProfile
+startup = StartupProfile.from_argv(sys.argv[1:])
+
+# Headless commands (build/validate/import/unpack) never need the GUI toolkit
+if __name__ == "__main__" and sys.argv[1:] and not startup.enabled:
+    from core import cli
+    if cli.wants_cli(sys.argv[1:]):
+        sys.exit(cli.main(sys.argv[1:]))
+
+from core.export import ExportProfile
+from core.history import History
+from core.journal import find_recoverable
+from core.media import MediaPipeline, format_report
+from core.model import Module, Topic
+from core.module_set import ModuleSet
+from core.ops import delete_op, insert_op, set_op, unset_op
+from core.schema import format_problems
+from core.search import SearchIndex
+startup.mark("core imports")
+
 import customtkinter
-from tkinter import filedialog, messagebox
+from tkinter import BooleanVar, filedialog, messagebox
+startup.mark("customtkinter import")
 
 from ui.sidebar import SidebarFrame
 from ui.main_frame import MainFrame
+from ui.background import BackgroundTask
+from ui.thumbnails import ThumbnailCache, default_disk_dir
+from ui.assets import AssetRegistry
+startup.mark("ui imports")
 
 class App(customtkinter.CTk):
+    # How often the edit journal is folded into a snapshot
+    COMPACT_INTERVAL_MS = 60_000
+    PROFILE_LABELS = {"Readable JSON": "pretty", "Compact JSON": "compact"}
+
     def __init__(self):
         super().__init__()
 
@@ -17,11 +44,21 @@ class App(customtkinter.CTk):
         self.geometry("1024x640")
         self.protocol("WM_DELETE_WINDOW", self.on_close)
         customtkinter.set_appearance_mode("light")
+        startup.mark("Tk root window")
 
         self.grid_columnconfigure(4, weight=1)
         self.grid_rowconfigure(1, weight=1)
 
-        self.modules = []
+        # Set when imported images should be downscaled and re-encoded, which is lossy
+        self.media_pipeline = None
+        self.export_profile = ExportProfile()
+        self.use_module_set(ModuleSet())
+        self.task = None
+        # Debouncers holding editor text that has not reached the model yet
+        self.pending_edits = set()
+        self.thumbnails = ThumbnailCache(self, disk_dir=default_disk_dir())
+        self.assets = AssetRegistry(self.resource_path)
+        startup.mark("module set")
 
         # Top control buttons container
         top_controls = customtkinter.CTkFrame(self, fg_color="transparent")
@@ -33,168 +70,414 @@ class App(customtkinter.CTk):
         self.button_open = customtkinter.CTkButton(top_controls, text="Open", width=48, command=self.open_file)
         self.button_open.pack(side="left", padx=(0, 4))
         self.button_save = customtkinter.CTkButton(top_controls, text="Save", width=48, command=self.save_file)
-        self.button_save.pack(side="left")
+        self.button_save.pack(side="left", padx=(0, 4))
+        self.button_import = customtkinter.CTkButton(top_controls, text="Import", width=48, command=self.import_file)
+        self.button_import.pack(side="left")
+        self.button_undo = customtkinter.CTkButton(top_controls, text="Undo", width=48, command=self.undo, state="disabled")
+        self.button_undo.pack(side="left", padx=(12, 4))
+        self.button_redo = customtkinter.CTkButton(top_controls, text="Redo", width=48, command=self.redo, state="disabled")
+        self.button_redo.pack(side="left")
+
+        # Module JSON format used by Save
+        self.profile_menu = customtkinter.CTkOptionMenu(top_controls, values=list(self.PROFILE_LABELS), width=140, command=self.set_export_profile)
+        self.profile_menu.pack(side="left", padx=(12, 0))
+
+        # Opt-in, since re-encoding loses quality
+        self.optimize_images_var = BooleanVar(value=False)
+        self.optimize_images_checkbox = customtkinter.CTkCheckBox(top_controls, text="Optimize images", variable=self.optimize_images_var, command=self.set_media_pipeline)
+        self.optimize_images_checkbox.pack(side="left", padx=(12, 4))
+        self.button_media_report = customtkinter.CTkButton(top_controls, text="Report", width=48, command=self.show_media_report)
+        self.button_media_report.pack(side="left")
+
+        self.bind_all("<Control-z>", self.undo)
+        self.bind_all("<Control-y>", self.redo)
+        self.bind_all("<Control-Shift-Z>", self.redo)
+
+        # Progress of a running open/save, built by the first one
+        self.top_controls = top_controls
+        self.progress_bar = None
+        startup.mark("toolbar")
 
         # Layout frames
         self.sidebar_frame = SidebarFrame(self, self)
         self.sidebar_frame.grid(row=1, column=0, padx=10, pady=10, sticky="nsew", columnspan=3)
         self.main_frame = MainFrame(self, self)
         self.main_frame.grid(row=1, column=4, padx=10, pady=10, sticky="nsew")
+        startup.mark("sidebar and editor")
+
+        self.after(self.COMPACT_INTERVAL_MS, self.compact_journal)
+        self.after_idle(self.finish_startup)
+
+    def finish_startup(self):
+        # Draw everything still pending, so the report ends with the window on screen
+        self.update_idletasks()
+        startup.mark("first draw")
+        startup.report()
+        if startup.exit_after:
+            self.on_close()
+            return
+        self.offer_recovery()
+
+    def use_module_set(self, module_set):
+        module_set.media_pipeline = self.media_pipeline
+        module_set.export_profile = self.export_profile
+        if module_set.journal is None:
+            module_set.start_journal()
+        module_set.listeners.append(self.on_model_change)
+        self.module_set = module_set
+        self.history = History()
+        self.search_index = SearchIndex(module_set.modules)
+        self.build_search_index()
+
+    def build_search_index(self):
+        """Index the set on a worker thread, so that large sets are shown before their index is ready."""
+        index = self.search_index
+        index.begin_build()
+
+        def on_built(_):
+            index.finish_build()
+            # A query typed meanwhile was shown as still indexing
+            if index is self.search_index and self.sidebar_frame.query:
+                self.sidebar_frame.show_results()
+
+        BackgroundTask(self, lambda task: index.build(), on_done=on_built, on_error=on_built).start()
+
+    def set_export_profile(self, label):
+        self.export_profile = ExportProfile(self.PROFILE_LABELS[label])
+        self.module_set.export_profile = self.export_profile
+
+    def set_media_pipeline(self):
+        self.media_pipeline = MediaPipeline() if self.optimize_images_var.get() else None
+        self.module_set.media_pipeline = self.media_pipeline
+
+    def show_media_report(self):
+        """Show the bytes saved per optimized image and for the whole set."""
+        report = self.module_set.media_report
+        if not report:
+            messagebox.showinfo("Image report", "No images were optimized yet. Tick \"Optimize images\" to shrink the images you import.")
+            return
+        messagebox.showinfo("Image report", format_report(report))
+
+    def apply(self, ops):
+        """Apply a change to the modules, see core.ops. All model edits go through here."""
+        # Pending edits are addressed by index, so they are committed before inserts and deletes move them
+        if any(kind != "set" for kind, _, _ in ops):
+            self.flush_edits()
+        inverse = self.module_set.apply(ops)
+        if inverse:
+            self.history.record(inverse)
+            self.update_history_buttons()
+
+    def on_model_change(self, ops):
+        self.search_index.update(ops)
+        self.sidebar_frame.sync(ops)
+
+    def undo(self, _event=None):
+        self.step_history(self.history.undo)
+        return "break"
+
+    def redo(self, _event=None):
+        self.step_history(self.history.redo)
+        return "break"
+
+    def step_history(self, step):
+        # Edits still being typed become a change of their own first
+        self.flush_edits()
+        if step(self.module_set):
+            self.main_frame.refresh()
+        self.update_history_buttons()
+
+    def update_history_buttons(self):
+        self.button_undo.configure(state="normal" if self.history.can_undo() else "disabled")
+        self.button_redo.configure(state="normal" if self.history.can_redo() else "disabled")
+
+    def set_value(self, path, value):
+        self.apply([set_op(path, value)])
+
+    def compact_journal(self):
+        self.fold_journal(self.module_set.compact_journal())
+        self.after(self.COMPACT_INTERVAL_MS, self.compact_journal)
+
+    def fold_journal(self, fold):
+        """Fold the journal into its snapshot on a worker thread, see ModuleSet.compact_journal()."""
+        if fold is not None:
+            BackgroundTask(self, lambda task: fold()).start()
+
+    def offer_recovery(self):
+        """Offer to restore the edits an unclean exit left behind."""
+        for snapshot_time, temp_dir in find_recoverable():
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(snapshot_time))
+            if not messagebox.askyesno("Recover", f"ModuLearn Maker did not exit cleanly.\nRestore the unsaved changes from {when}?"):
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                continue
+            try:
+                module_set = ModuleSet.recover(temp_dir)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to recover changes:\n{e}")
+                continue
+            self.main_frame.clear()
+            self.cleanup_temp_dir()
+            self.use_module_set(module_set)
+            self.load_modules(self.modules)
+            return
+
+    def confirm_discard(self):
+        """Ask before unsaved changes are thrown away."""
+        self.flush_edits()
+        if not self.module_set.has_unsaved_changes():
+            return True
+        return messagebox.askyesno("Unsaved changes", "Discard the unsaved changes?")
+
+    # The editors work on these directly, so keep them as App attributes
+    @property
+    def modules(self):
+        return self.module_set.modules
+
+    @modules.setter
+    def modules(self, modules):
+        self.module_set.modules = modules
+
+    @property
+    def temp_dir(self):
+        return self.module_set.temp_dir
+
+    @property
+    def media_dir(self):
+        return self.module_set.media_dir
 
-        self.temp_dir = tempfile.mkdtemp(prefix="modulearn-maker_")
-        self.media_dir = None
+    @media_dir.setter
+    def media_dir(self, media_dir):
+        self.module_set.media_dir = media_dir
+
+    def flush_edits(self):
+        """Commit every debounced edit that is still waiting for its timer."""
+        for debouncer in list(self.pending_edits):
+            debouncer.flush()
 
     def on_close(self):
         """Handle graceful exit."""
+        if not self.confirm_discard():
+            return
+        if self.task and self.task.is_running():
+            self.task.cancel()
+            self.task.thread.join()
+        self.thumbnails.shutdown()
         self.cleanup_temp_dir()
         self.destroy()
 
     def new_file(self):
         """Start a new module session."""
+        if not self.confirm_discard():
+            return
+        self.main_frame.clear()
         self.cleanup_temp_dir()
-        self.temp_dir = tempfile.mkdtemp(prefix="modulearn-maker_")
-        self.modules = []
+        self.use_module_set(ModuleSet())
         self.load_modules(self.modules)
         messagebox.showinfo("Info", "New module set created.")
 
     def open_file(self):
-        """Open and extract a zipped module set."""
+        """Open a zipped module set, reading media from it only when needed."""
+        if not self.confirm_discard():
+            return
         file_path = filedialog.askopenfilename(filetypes=[("ZIP File", "*.zip")])
         if not file_path:
             return
 
-        self.cleanup_temp_dir()
-
-        try:
-            self.temp_dir = tempfile.mkdtemp(prefix="modulearn-maker_")
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                zip_ref.extractall(self.temp_dir)
-
-            # Load all JSON files in the root as modules
-            module_files = sorted([
-                f for f in os.listdir(self.temp_dir)
-                if f.endswith('.json') and os.path.isfile(os.path.join(self.temp_dir, f))
-            ], key=lambda f: int(f.split("_")[1].split(".")[0]))
-
-            self.modules = []
-            for file in module_files:
-                with open(os.path.join(self.temp_dir, file), "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self.modules.append(data)
-
-            # Handle media directory
-            media_path = os.path.join(self.temp_dir, "media")
-            if os.path.exists(media_path) and os.path.isdir(media_path):
-                self.media_dir = media_path
-            else:
-                self.media_dir = None
-
+        def work(task):
+            module_set = ModuleSet.from_archive(file_path, lazy=True, progress=task.report, cancel_event=task.cancel_event)
+            module_set.start_journal()
+            return module_set, module_set.validate()
+
+        def on_done(result):
+            module_set, problems = result
+            # Pending edits belong to the set being replaced
+            self.main_frame.clear()
+            self.cleanup_temp_dir()
+            self.use_module_set(module_set)
             self.load_modules(self.modules)
-            messagebox.showinfo("Success", f"Loaded {len(self.modules)} modules.")
+            if problems:
+                messagebox.showwarning("Problems found", f"Loaded {len(self.modules)} modules, but ModuLearn may not handle these:\n\n{format_problems(problems)}")
+            else:
+                messagebox.showinfo("Success", f"Loaded {len(self.modules)} modules.")
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load file:\n{e}")
+        self.run_task("Opening", work, on_done, "Failed to load file")
 
     def save_file(self):
         """Save current modules into a new ZIP file."""
+        self.flush_edits()
+        problems = self.module_set.validate()
+        if problems and not messagebox.askyesno("Problems found", f"ModuLearn may not handle these:\n\n{format_problems(problems)}\n\nSave anyway?"):
+            return
         file_path = filedialog.asksaveasfilename(defaultextension=".zip", filetypes=[("ZIP File", "*.zip")])
         if not file_path:
             return
 
-        try:
-            # Ensure temp_dir exists
-            if not os.path.exists(self.temp_dir):
-                messagebox.showerror("Error", "No modules data initialized.")
-                return
-
-            # Remove old JSON files to avoid duplication
-            for f in os.listdir(self.temp_dir):
-                if f.endswith(".json"):
-                    os.remove(os.path.join(self.temp_dir, f))
-
-            # Write updated module JSON files
-            for i, module in enumerate(self.modules):
-                filename = f"module_{i}.json"
-                with open(os.path.join(self.temp_dir, filename), "w", encoding="utf-8") as f:
-                    json.dump(module, f, indent=2, ensure_ascii=True)
-
-            # Bundle temp_dir into zip
-            with zipfile.ZipFile(file_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-                for foldername, _, filenames in os.walk(self.temp_dir):
-                    for filename in filenames:
-                        file_path_in_temp = os.path.join(foldername, filename)
-                        arcname = os.path.relpath(file_path_in_temp, self.temp_dir)
-                        zipf.write(file_path_in_temp, arcname)
-
-            messagebox.showinfo("Success", f"Modules saved to ZIP:\n{file_path}")
+        # Ensure temp_dir exists
+        if not self.temp_dir or not os.path.exists(self.temp_dir):
+            messagebox.showerror("Error", "No modules data initialized.")
+            return
 
+        # Snapshot the modules here; only compression and writing run in the background
+        try:
+            plan = self.module_set.plan_save(file_path)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save file:\n{e}")
+            return
+        module_set = self.module_set
+
+        def work(task):
+            module_set.write_archive(plan, workers=os.cpu_count(), progress=task.report, cancel_event=task.cancel_event)
+
+        def on_done(_):
+            self.fold_journal(module_set.finish_save(plan))
+            message = f"Modules saved to ZIP:\n{file_path}"
+            if plan.dropped:
+                dropped_kb = sum(size for _, size in plan.dropped) / 1024
+                message += f"\n\nLeft out {len(plan.dropped)} unused media files ({dropped_kb:.0f} KB)."
+            messagebox.showinfo("Success", message)
+
+        self.run_task("Saving", work, on_done, "Failed to save file")
+
+    def import_file(self):
+        """Add modules from Markdown files and quiz questions from CSV files, see core.importer."""
+        from core.importer import plan_import
+
+        paths = filedialog.askopenfilenames(filetypes=[("Markdown or CSV", "*.md *.markdown *.csv")])
+        if not paths:
+            return
+        self.flush_edits()
+        # Questions without a module column go into the module being edited
+        view = self.main_frame.view
+        target = self.modules[view[1][0]] if view else None
+        module_set = self.module_set
+
+        def work(task):
+            return plan_import(paths, module_set.import_media, target=target, progress=task.report, cancel_event=task.cancel_event)
+
+        def on_done(plan):
+            count = len(self.modules)
+            self.apply(plan.ops(self.modules))
+            # A quiz the questions went into is a new list now
+            self.main_frame.refresh()
+            messagebox.showinfo("Success", f"Imported {plan.question_count} questions and {len(self.modules) - count} new modules.")
+
+        self.run_task("Importing", work, on_done, "Failed to import")
+
+    def import_image(self, file_path, on_done):
+        """Import an image chosen in an editor on a worker thread, then call on_done(name) on the Tk thread."""
+        if self.task and self.task.is_running():
+            messagebox.showinfo("Busy", "Wait for the current task to finish first.")
+            return
+        module_set = self.module_set
+
+        def work(task):
+            task.report(0, 1, os.path.basename(file_path))
+            return module_set.import_media(file_path)
+
+        self.run_task("Importing image", work, on_done, "Failed to import image")
+
+    def run_task(self, label, work, on_done, error_message):
+        """Run work on a background thread while showing its progress."""
+        def on_progress(done, total, name):
+            self.progress_bar.set(done / total if total else 1)
+            self.progress_label.configure(text=f"{label} {done}/{total}: {name}")
+
+        def finish():
+            self.task = None
+            self.progress_bar.pack_forget()
+            self.progress_label.pack_forget()
+            self.button_cancel.pack_forget()
+            for button in (self.button_new, self.button_open, self.button_save, self.button_import):
+                button.configure(state="normal")
+
+        def on_success(result):
+            finish()
+            try:
+                on_done(result)
+            except Exception as e:
+                messagebox.showerror("Error", f"{error_message}:\n{e}")
+
+        def on_error(error):
+            finish()
+            messagebox.showerror("Error", f"{error_message}:\n{error}")
+
+        for button in (self.button_new, self.button_open, self.button_save, self.button_import):
+            button.configure(state="disabled")
+        if self.progress_bar is None:
+            self.progress_bar = customtkinter.CTkProgressBar(self.top_controls, width=160)
+            self.progress_label = customtkinter.CTkLabel(self.top_controls, text="", font=("Arial", 10), text_color="gray")
+            self.button_cancel = customtkinter.CTkButton(self.top_controls, text="Cancel", width=48, command=self.cancel_task)
+        self.progress_bar.set(0)
+        self.progress_label.configure(text=f"{label}...")
+        self.progress_bar.pack(side="left", padx=(12, 4))
+        self.progress_label.pack(side="left", padx=(0, 4))
+        self.button_cancel.pack(side="left")
+
+        self.task = BackgroundTask(self, work, on_progress=on_progress, on_done=on_success, on_error=on_error, on_cancel=finish).start()
+
+    def cancel_task(self):
+        if self.task:
+            self.task.cancel()
 
     def cleanup_temp_dir(self):
         """Remove temporary directory and all contents."""
-        if hasattr(self, "temp_dir") and self.temp_dir and os.path.exists(self.temp_dir):
+        temp_dir = self.module_set.temp_dir
+        if temp_dir and os.path.exists(temp_dir):
             try:
-                shutil.rmtree(self.temp_dir)
-                print(f"Cleaned temp dir: {self.temp_dir}")
+                self.module_set.cleanup()
+                print(f"Cleaned temp dir: {temp_dir}")
             except Exception as e:
                 print(f"Error cleaning temp dir: {e}")
             finally:
-                self.temp_dir = None
+                self.module_set.temp_dir = None
     
     def resource_path(self, relative_path):
         base_path = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
         return os.path.join(base_path, relative_path)
 
     def load_modules(self, modules):
-        self.sidebar_frame.module_tree.delete(*self.sidebar_frame.module_tree.get_children())
-        for i, module in enumerate(modules):
-            module_id = self.sidebar_frame.module_tree.insert("", "end", text=module["title"], open=True)
-            
-            # Load Topics
-            for topic in module.get("topics", []):
-                self.sidebar_frame.module_tree.insert(module_id, "end", text=topic["title"])
-            
-            # Load Quiz
-            if "assessment" in module:
-                self.sidebar_frame.module_tree.insert(module_id, "end", text="Quiz", tags=("quiz"))
+        self.sidebar_frame.rebuild(modules)
+        self.update_history_buttons()
 
     def add_module(self):
-        new_module = {"id": f"{len(self.modules)}","title": f"Untitled Module {len(self.modules)}", "imgSrc": None, "topics": []}
-        self.modules.append(new_module)
-        self.load_modules(self.modules)
+        new_module = Module(id=f"{len(self.modules)}", title=f"Untitled Module {len(self.modules)}")
+        self.apply([insert_op([len(self.modules)], new_module)])
 
-    def delete_module(self, module_index):
-        del self.modules[module_index]
+    def rename_module(self, module_index, title):
+        self.set_value([module_index, "title"], title)
 
+    def delete_module(self, module_index):
         # Reassign module IDs based on new index
-        for i, module in enumerate(self.modules):
-            module["id"] = str(i)
-
-        self.load_modules(self.modules)
+        ops = [delete_op([module_index])]
+        ops += [set_op([i, "id"], str(i)) for i in range(module_index, len(self.modules) - 1)]
+        self.apply(ops)
     
     def add_topic(self, module_index):
         module = self.modules[module_index]
-        module.setdefault("topics", []).append({"title": f"Topic {len(module['topics'])}", "sections": []})
-        self.load_modules(self.modules)
+        topic_count = len(module.get("topics", []))
+        topic = Topic(title=f"Topic {topic_count}")
+        if "topics" in module:
+            self.apply([insert_op([module_index, "topics", topic_count], topic)])
+        else:
+            # Not set_op(..., []) plus an insert: the journal writes the list as it is after the change
+            self.set_value([module_index, "topics"], [topic])
+
+    def rename_topic(self, module_index, topic_index, title):
+        self.set_value([module_index, "topics", topic_index, "title"], title)
 
     def delete_topic(self, module_index, topic_index):
-        del self.modules[module_index]["topics"][topic_index]
-        self.load_modules(self.modules)
+        self.apply([delete_op([module_index, "topics", topic_index])])
     
     def add_quiz(self, module_index):
         module = self.modules[module_index]
         if "assessment" not in module:
-            module["assessment"] = []
-            self.load_modules(self.modules)
+            self.set_value([module_index, "assessment"], [])
         else:
             messagebox.showinfo("Warning", "Only one Quiz can be added per Module")
 
     def delete_quiz(self, module_index):
-        module = self.modules[module_index]
-        if "assessment" in module:
-            del module["assessment"]
-            self.load_modules(self.modules)
+        if "assessment" in self.modules[module_index]:
+            self.apply([unset_op([module_index, "assessment"])])
 
 if __name__ == "__main__":
     app = App()
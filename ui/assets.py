@@ -0,0 +1,24 @@
+import customtkinter
+
+DELETE_ICON = "assets/icon_delete.png"
+
+class AssetRegistry:
+    """Bundled icons, decoded on first use and shared as CTkImage instances.
+
+    A CTkImage can be shown by any number of widgets, so every delete button
+    in a 300-section topic uses the same decoded image.
+    """
+    def __init__(self, resource_path):
+        self.resource_path = resource_path
+        self.images = {}
+
+    def image(self, relative_path):
+        """Return the shared CTkImage for a bundled asset."""
+        image = self.images.get(relative_path)
+        if image is None:
+            from PIL import Image
+            with Image.open(self.resource_path(relative_path)) as img:
+                img.load()
+                image = customtkinter.CTkImage(light_image=img.copy())
+            self.images[relative_path] = image
+        return image
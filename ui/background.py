@@ -0,0 +1,74 @@
+import queue
+import threading
+
+from core import OperationCancelled
+
+class BackgroundTask:
+    """Runs work(task) on a worker thread and reports back through Tk's after() loop.
+
+    The worker calls task.report() to queue progress and checks task.cancel_event;
+    every callback (on_progress, on_done, on_error, on_cancel) runs on the Tk
+    thread, so they may touch widgets and App state freely.
+    """
+    POLL_MS = 50
+
+    def __init__(self, widget, work, on_progress=None, on_done=None, on_error=None, on_cancel=None):
+        self.widget = widget
+        self.work = work
+        self.on_progress = on_progress or (lambda done, total, name: None)
+        self.on_done = on_done or (lambda result: None)
+        self.on_error = on_error or (lambda error: None)
+        self.on_cancel = on_cancel or (lambda: None)
+
+        self.cancel_event = threading.Event()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        self.widget.after(self.POLL_MS, self.poll)
+        return self
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_running(self):
+        return self.thread.is_alive()
+
+    def report(self, done, total, name):
+        """Queue a progress update. Called from the worker thread."""
+        self.queue.put(("progress", (done, total, name)))
+
+    def run(self):
+        try:
+            self.queue.put(("done", self.work(self)))
+        except OperationCancelled:
+            self.queue.put(("cancelled", None))
+        except Exception as e:
+            self.queue.put(("error", e))
+
+    def poll(self):
+        # Only the latest progress update matters, so skip stale ones
+        latest_progress = None
+        while True:
+            try:
+                kind, payload = self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "progress":
+                latest_progress = payload
+                continue
+            if latest_progress is not None:
+                self.on_progress(*latest_progress)
+            if kind == "done":
+                self.on_done(payload)
+            elif kind == "cancelled":
+                self.on_cancel()
+            else:
+                self.on_error(payload)
+            return
+
+        if latest_progress is not None:
+            self.on_progress(*latest_progress)
+        self.widget.after(self.POLL_MS, self.poll)
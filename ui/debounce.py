@@ -0,0 +1,43 @@
+class Debouncer:
+    """Coalesces a burst of edits in one widget into a single model update.
+
+    schedule() is called on every keystroke; commit() then runs once, after the
+    widget has been idle for delay_ms, when it loses focus, or when flush() is
+    called. Timers run on the app rather than the widget so that they never
+    outlive the widget silently, and the app keeps every debouncer with a
+    pending edit so App.flush_edits() can commit them all before a save.
+    """
+    DELAY_MS = 400
+
+    def __init__(self, app, commit, delay_ms=DELAY_MS):
+        self.app = app
+        self.commit = commit
+        self.delay_ms = delay_ms
+        self.after_id = None
+
+    def watch(self, widget):
+        """Schedule on key release in widget and flush when it loses focus."""
+        widget.bind("<KeyRelease>", lambda _: self.schedule())
+        widget.bind("<FocusOut>", lambda _: self.flush())
+        return self
+
+    def schedule(self):
+        if self.after_id is not None:
+            self.app.after_cancel(self.after_id)
+        self.after_id = self.app.after(self.delay_ms, self.flush)
+        self.app.pending_edits.add(self)
+
+    def flush(self):
+        if self.after_id is None:
+            return
+        self.app.after_cancel(self.after_id)
+        self.after_id = None
+        self.app.pending_edits.discard(self)
+        self.commit()
+
+    def cancel(self):
+        """Drop a pending edit without committing it."""
+        if self.after_id is not None:
+            self.app.after_cancel(self.after_id)
+            self.after_id = None
+        self.app.pending_edits.discard(self)
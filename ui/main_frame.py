@@ -1,11 +1,9 @@
-import os
-import re
-import shutil
 import customtkinter
 from tkinter import StringVar, filedialog
-from ui.section_editor import SectionListFrame
-from ui.quiz_editor import QuizListFrame
-from PIL import Image
+from core.model import Question, find_path, new_section
+from core.ops import delete_op, insert_op
+from ui.assets import DELETE_ICON
+from ui.thumbnails import show_thumbnail
 
 class MainFrame(customtkinter.CTkFrame):
     def __init__(self, master, app):
@@ -22,14 +20,59 @@ class MainFrame(customtkinter.CTkFrame):
         self.placeholder = customtkinter.CTkLabel(self, text="")
         self.placeholder.grid(row=1, column=0, sticky="n")
 
+        # The editor shown, as (show method, arguments), the uid of the module
+        # or topic it shows, and its section or question list
+        self.view = None
+        self.view_uid = None
+        self.list_frame = None
+
     def clear(self):
+        self.app.flush_edits()
+        self.app.thumbnails.cancel_pending()
+        self.view = None
+        self.view_uid = None
+        self.list_frame = None
         self.placeholder.configure(text="")
         for child in self.winfo_children():
             if child not in [self.label, self.placeholder]:
                 child.destroy()
 
+    def refresh(self):
+        """Show the current editor again after its data changed underneath it, e.g. by an undo.
+
+        The change may have moved what the editor shows, so it is looked up
+        again by uid rather than by index.
+        """
+        if self.view is None:
+            return
+        show = self.view[0]
+        args = self.locate(show, self.view_uid)
+        if args is None:
+            self.clear()
+            return
+
+        first, offset = (self.list_frame.first, self.list_frame.offset) if self.list_frame else (0, 0)
+        show(*args)
+        if self.list_frame:
+            self.list_frame.scroll_to(first, offset)
+
+    def locate(self, show, uid):
+        """Return the arguments that show the record with uid in show, or None if it is gone."""
+        for module_index, module in enumerate(self.app.modules):
+            if show == self.show_topic_editor:
+                for topic_index, topic in enumerate(module.get("topics", [])):
+                    if topic.uid == uid:
+                        return (module_index, topic_index)
+            elif module.uid == uid:
+                if show == self.show_quiz_editor and "assessment" not in module:
+                    return None
+                return (module_index,)
+        return None
+
     def show_module_editor(self, module_index):
         self.clear()
+        self.view = (self.show_module_editor, (module_index,))
+        self.view_uid = self.app.modules[module_index].uid
 
         # Module Title
         name_var = StringVar(value=self.app.modules[module_index]["title"])
@@ -40,8 +83,7 @@ class MainFrame(customtkinter.CTkFrame):
         info_label.grid(row=2, column=0, sticky="w", padx=4)
         
         def update_name():
-            self.app.modules[module_index]["title"] = name_var.get()
-            self.app.load_modules(self.app.modules)
+            self.app.rename_module(module_index, name_var.get())
 
         name_entry.bind("<Return>", lambda _: update_name())
 
@@ -50,7 +92,7 @@ class MainFrame(customtkinter.CTkFrame):
             self.clear()
         
         # Delete Button
-        delete_image = customtkinter.CTkImage(light_image=Image.open(self.app.resource_path("assets/icon_delete.png")))
+        delete_image = self.app.assets.image(DELETE_ICON)
         delete_button = customtkinter.CTkButton(
             self, 
             image=delete_image, 
@@ -94,40 +136,34 @@ class MainFrame(customtkinter.CTkFrame):
             file_path = filedialog.askopenfilename(filetypes=[("Image Files", "*.png *.jpg *.jpeg *.webp")])
             if not file_path:
                 return
+            module = self.app.modules[module_index]
+
+            def on_imported(name):
+                # Modules may have been moved or deleted meanwhile
+                path = find_path(self.app.modules, module)
+                if path is None:
+                    return
+                self.app.set_value(path + ["imgSrc"], name)
+                if self.view and self.view[0] == self.show_module_editor and self.view_uid == module.uid:
+                    show_thumbnail(self.app, self.preview_label, self.app.module_set.media_path(name))
 
-            media_dir = self.app.media_dir or os.path.join(self.app.temp_dir, "media")
-            os.makedirs(media_dir, exist_ok=True)
-            self.app.media_dir = media_dir
-
-            orig = os.path.basename(file_path)
-            name, ext = os.path.splitext(orig)
-            safe = re.sub(r'[^a-zA-Z0-9_-]', '_', name).lower()
-            dest = os.path.join(media_dir, safe + ext.lower())
-            shutil.copy(file_path, dest)
-
-            self.app.modules[module_index]["imgSrc"] = safe + ext.lower()
-            load_preview(dest)
-
-        # Image preview
-        def load_preview(path):
-            try:
-                img = Image.open(path)
-                img.thumbnail((256,256))
-                self.tk_image = customtkinter.CTkImage(light_image=img, size=img.size)
-                self.preview_label.configure(image=self.tk_image, text="")
-            except Exception as e:
-                self.preview_label.configure(text=f"Error loading image:\n{e}", image="")
+            self.app.import_image(file_path, on_imported)
 
         if self.app.modules[module_index].get("imgSrc"):
-            abs_path = os.path.join(self.app.temp_dir, "media", self.app.modules[module_index]["imgSrc"])
-            if os.path.exists(abs_path):
-                load_preview(abs_path)
+            abs_path = self.app.module_set.media_path(self.app.modules[module_index]["imgSrc"])
+            if abs_path:
+                show_thumbnail(self.app, self.preview_label, abs_path)
 
         # Upload Image button
         customtkinter.CTkButton(self, text="Upload Image", command=choose_image).grid(row=6, column=0, columnspan=2)
 
     def show_topic_editor(self, module_index, topic_index):
+        # The editor modules are imported when first shown rather than at startup
+        from ui.section_editor import SectionListFrame
+
         self.clear()
+        self.view = (self.show_topic_editor, (module_index, topic_index))
+        self.view_uid = self.app.modules[module_index]["topics"][topic_index].uid
 
         # Topic Title
         name_var = StringVar(value=self.app.modules[module_index]["topics"][topic_index]["title"])
@@ -138,8 +174,7 @@ class MainFrame(customtkinter.CTkFrame):
         info_label.grid(row=2, column=0, sticky="w", padx=4)
         
         def update_name():
-            self.app.modules[module_index]["topics"][topic_index]["title"] = name_var.get()
-            self.app.load_modules(self.app.modules)
+            self.app.rename_topic(module_index, topic_index, name_var.get())
 
         name_entry.bind("<Return>", lambda _: update_name())
 
@@ -148,7 +183,7 @@ class MainFrame(customtkinter.CTkFrame):
             self.show_module_editor(module_index=module_index)
         
         # Delete Button
-        delete_image = customtkinter.CTkImage(light_image=Image.open(self.app.resource_path("assets/icon_delete.png")))
+        delete_image = self.app.assets.image(DELETE_ICON)
         delete_button = customtkinter.CTkButton(
             self, 
             image=delete_image, 
@@ -167,28 +202,26 @@ class MainFrame(customtkinter.CTkFrame):
 
         module = self.app.modules[module_index]
         topic = module["topics"][topic_index]
-        topic.setdefault("sections", [])
-        section_list = topic["sections"]
+        sections_path = [module_index, "topics", topic_index, "sections"]
+        # Topics without sections get the list shown here with their first section
+        section_list = topic.get("sections")
+        if section_list is None:
+            section_list = []
 
         def add_section():
-            section_data = {"type": section_type.get()}
-            if section_type.get() == "image":
-                section_data.update({"imgSrc": None, "caption": "", "attribution": ""})
-            elif section_type.get() == "active-recall":
-                section_data.update({"question": "", "answer": ""})
-            elif section_type.get() == "list":
-                section_data.update({"category": "unordered", "hasHeader": False, "entries": [""]})
-            elif section_type.get() == "text":
-                section_data.update({"header": "","content": ""})
+            section_data = new_section(section_type.get())
+            if "sections" in topic:
+                self.app.apply([insert_op(sections_path + [len(section_list)], section_data)])
             else:
-                section_data.update({"content": ""})
-
-            section_list.append(section_data)
-            self.show_topic_editor(module_index, topic_index)
+                # Set with the section already in it, so the journal does not record it twice
+                section_list.append(section_data)
+                self.app.set_value(sections_path, section_list)
+            section_frame.item_inserted(len(section_list) - 1)
 
         def delete_section(index):
-            del section_list[index]
-            self.show_topic_editor(module_index, topic_index)
+            self.app.flush_edits()
+            self.app.apply([delete_op(sections_path + [index])])
+            section_frame.item_removed(index)
 
         types = ["text", "list", "image", "trivia", "remember", "active-recall"]
 
@@ -206,20 +239,26 @@ class MainFrame(customtkinter.CTkFrame):
         add_button.grid(row=0, column=1, padx=8)
 
         # Render frame for showing list of sections
-        section_frame = SectionListFrame(self, section_list, self.app, on_delete=delete_section)
+        section_frame = SectionListFrame(self, section_list, self.app, sections_path, on_delete=delete_section)
         section_frame.grid(row=10, column=0, padx=10, pady=10, columnspan=2, sticky="nsew")
+        self.list_frame = section_frame
 
     def show_quiz_editor(self, module_index):
+        from ui.quiz_editor import QuizListFrame
+
         self.clear()
+        self.view = (self.show_quiz_editor, (module_index,))
+        self.view_uid = self.app.modules[module_index].uid
 
         assessment_list = self.app.modules[module_index]["assessment"]
+        assessment_path = [module_index, "assessment"]
 
         def delete_button_pressed():
             self.app.delete_quiz(module_index)
             self.show_module_editor(module_index=module_index)
         
         # Delete Button
-        delete_image = customtkinter.CTkImage(light_image=Image.open(self.app.resource_path("assets/icon_delete.png")))
+        delete_image = self.app.assets.image(DELETE_ICON)
         delete_button = customtkinter.CTkButton(
             self, 
             image=delete_image, 
@@ -234,24 +273,19 @@ class MainFrame(customtkinter.CTkFrame):
         delete_button.grid(row=1, column=1, padx=(0, 4))
 
         def add_question():
-            assessment_list.append({
-                "question": "",
-                "choices": {"a": "", "b": "", "c": "", "d": ""},
-                "answer": "",
-                "imgSrc": None,
-                "caption": "",
-                "attribution": ""
-            })
-            self.show_quiz_editor(module_index)
+            self.app.apply([insert_op(assessment_path + [len(assessment_list)], Question())])
+            quiz_frame.item_inserted(len(assessment_list) - 1)
 
         def delete_question(index):
-            del assessment_list[index]
-            self.show_quiz_editor(module_index)
+            self.app.flush_edits()
+            self.app.apply([delete_op(assessment_path + [index])])
+            quiz_frame.item_removed(index)
 
         # Add Question Button
         add_button = customtkinter.CTkButton(self, text="Add Question", command=add_question)
         add_button.grid(row=2, column=0, padx=8)
 
         # Render frame for showing list of sections
-        quiz_frame = QuizListFrame(self, assessment_list, self.app, on_delete=delete_question)
-        quiz_frame.grid(row=10, column=0, padx=10, pady=10, columnspan=2, sticky="nsew")
\ No newline at end of file
+        quiz_frame = QuizListFrame(self, assessment_list, self.app, assessment_path, on_delete=delete_question)
+        quiz_frame.grid(row=10, column=0, padx=10, pady=10, columnspan=2, sticky="nsew")
+        self.list_frame = quiz_frame
\ No newline at end of file
@@ -1,21 +1,67 @@
-import os
-import re
-import shutil
 import customtkinter
 from tkinter import StringVar, filedialog
-from PIL import Image
+from core.model import find_path
+from core.ops import set_op
+from ui.assets import DELETE_ICON
+from ui.debounce import Debouncer
+from ui.thumbnails import clear_thumbnail, show_thumbnail
+from ui.virtual_list import VirtualListFrame
 
 class QuizQuestionEditorFrame(customtkinter.CTkFrame):
-    def __init__(self, master, question_index, question_data, app, on_update=None):
+    def __init__(self, master, question_index, question_data, path, app, on_update=None):
         super().__init__(master)
         self.app = app
         self.question_index = question_index
         self.question_data = question_data
+        # Location of question_data in the module list, see core.ops
+        self.path = path
         self.on_update = on_update or (lambda: None)
 
+        # Suppresses the choice traces while fields are reloaded for another question
+        self.loading = False
+        self.debouncers = []
+
         self.grid_columnconfigure(1, weight=1)
         self.build_ui()
 
+    def set_question(self, question_index, question_data, path):
+        """Rebind the existing widgets to another question."""
+        self.flush_edits()
+        self.question_index = question_index
+        self.question_data = question_data
+        self.path = path
+        self.loading = True
+        try:
+            self.refresh_fields()
+        finally:
+            self.loading = False
+
+    def flush_edits(self):
+        for debouncer in self.debouncers:
+            debouncer.flush()
+
+    def set_field(self, key, value):
+        self.app.set_value(self.path + [key], value)
+
+    def choice_key(self, letter):
+        """The key the question uses for the choice shown as letter.
+
+        Choices are keyed "a"-"d" in new and imported questions but "A"-"D"
+        in sets saved by older versions; edits keep whichever the question has.
+        """
+        choices = self.question_data.get("choices") or {}
+        if letter in choices:
+            return letter
+        return letter.lower() if any(key.islower() for key in choices) else letter
+
+    def choice_text(self, letter):
+        return (self.question_data.get("choices") or {}).get(self.choice_key(letter), "")
+
+    def answer_letters(self):
+        """The letters the answer can be picked from: those of the question's choices, A-D if it has none."""
+        choices = self.question_data.get("choices") or {}
+        return sorted({key.upper() for key in choices}) or list(self.choice_vars)
+
     def build_ui(self):
         # Label
         question_label = customtkinter.CTkLabel(self, text=f"QUESTION {self.question_index + 1}", text_color="green")
@@ -31,35 +77,29 @@ class QuizQuestionEditorFrame(customtkinter.CTkFrame):
             file_path = filedialog.askopenfilename(filetypes=[("Image Files", "*.png *.jpg *.jpeg *.webp *.gif")])
             if not file_path:
                 return
-
-            media_dir = self.app.media_dir or os.path.join(self.app.temp_dir, "media")
-            os.makedirs(media_dir, exist_ok=True)
-            self.app.media_dir = media_dir
-
-            orig = os.path.basename(file_path)
-            name, ext = os.path.splitext(orig)
-            safe = re.sub(r'[^a-zA-Z0-9_-]', '_', name).lower()
-            dest = os.path.join(media_dir, safe + ext.lower())
-            shutil.copy(file_path, dest)
-
-            self.question_data["imgSrc"] = safe + ext.lower()
-            self.on_update()
-            load_preview(dest)
-
-        # Image preview
-        def load_preview(path):
-            try:
-                img = Image.open(path)
-                img.thumbnail((256,256))
-                self.tk_image = customtkinter.CTkImage(light_image=img, size=img.size)
-                self.preview_label.configure(image=self.tk_image, text="")
-            except Exception as e:
-                self.preview_label.configure(text=f"Error loading image:\n{e}", image="")
-
-        if self.question_data.get("imgSrc"):
-            abs_path = os.path.join(self.app.temp_dir, "media", self.question_data["imgSrc"])
-            if os.path.exists(abs_path):
-                load_preview(abs_path)
+            question = self.question_data
+
+            def on_imported(name):
+                # Questions may have been moved or deleted meanwhile
+                path = find_path(self.app.modules, question)
+                if path is None:
+                    return
+                self.app.set_value(path + ["imgSrc"], name)
+                self.on_update()
+                # The editor may have been rebound to another question meanwhile
+                if self.winfo_exists() and self.question_data is question:
+                    show_thumbnail(self.app, self.preview_label, self.app.module_set.media_path(name))
+
+            self.app.import_image(file_path, on_imported)
+
+        def show_current_image():
+            clear_thumbnail(self.preview_label)
+            if self.question_data.get("imgSrc"):
+                abs_path = self.app.module_set.media_path(self.question_data["imgSrc"])
+                if abs_path:
+                    show_thumbnail(self.app, self.preview_label, abs_path)
+
+        show_current_image()
 
         # Upload Image button
         customtkinter.CTkButton(self, text="Upload Image", command=choose_image).grid(row=3, column=0, columnspan=2)
@@ -77,15 +117,15 @@ class QuizQuestionEditorFrame(customtkinter.CTkFrame):
         attribution_entry.grid(row=7, column=0, columnspan=2, sticky="ew", padx=4, pady=(0, 4))
 
         def update_caption():
-            self.question_data["caption"] = caption_var.get()
+            self.set_field("caption", caption_var.get())
             self.on_update()
 
         def update_attribution():
-            self.question_data["attribution"] = attribution_var.get()
+            self.set_field("attribution", attribution_var.get())
             self.on_update()
 
-        caption_entry.bind("<KeyRelease>", lambda _: update_caption())
-        attribution_entry.bind("<KeyRelease>", lambda _: update_attribution())
+        caption_edits = Debouncer(self.app, update_caption).watch(caption_entry)
+        attribution_edits = Debouncer(self.app, update_attribution).watch(attribution_entry)
 
         # Question
         customtkinter.CTkLabel(self, text="Question").grid(row=8, column=0, sticky="w", padx=4, pady=(4, 0))
@@ -98,67 +138,96 @@ class QuizQuestionEditorFrame(customtkinter.CTkFrame):
         self.choice_vars = {}
         for i, letter in enumerate(choices):
             customtkinter.CTkLabel(self, text=f"{letter}").grid(row=10+i, column=0, padx=4, pady=(4, 0), sticky="e")
-            var = StringVar(value=self.question_data.get("choices", {}).get(letter, ""))
+            var = StringVar(value=self.choice_text(letter))
             entry = customtkinter.CTkEntry(self, textvariable=var)
             entry.grid(row=10+i, column=1, padx=4, sticky="ew")
             self.choice_vars[letter] = var
 
         def update_question():
-            self.question_data["question"] = question_var.get()
-            self.question_data["choices"] = {k: v.get() for k, v in self.choice_vars.items()}
+            if self.loading:
+                return
+            # Choices past D, e.g. from an imported CSV, are kept, and empty
+            # fields only become choices the question already has
+            choices = dict(self.question_data.get("choices") or {})
+            for letter, var in self.choice_vars.items():
+                key = self.choice_key(letter)
+                if key in choices or var.get():
+                    choices[key] = var.get()
+            self.app.apply([
+                set_op(self.path + ["question"], question_var.get()),
+                set_op(self.path + ["choices"], choices),
+            ])
+            answer_dropdown.configure(values=self.answer_letters())
             self.on_update()
         
-        # Bind events to Question fields
-        question_entry.bind("<KeyRelease>", lambda _: update_question())
+        # Question and choices are committed together once typing pauses
+        question_edits = Debouncer(self.app, update_question).watch(question_entry)
         for var in self.choice_vars.values():
-            var.trace_add("write", lambda *_: update_question())
+            var.trace_add("write", lambda *_: None if self.loading else question_edits.schedule())
+        self.debouncers = [caption_edits, attribution_edits, question_edits]
 
         def update_answer(choice):
-            self.question_data["answer"] = choice
+            self.set_field("answer", self.choice_key(choice))
             self.on_update()
         
         # Correct Answer
         customtkinter.CTkLabel(self, text="Answer").grid(row=(10+len(choices)), column=0, padx=4, pady=(4, 0), sticky="e")
-        answer_var = StringVar(value=self.question_data.get("answer", ""))
-        answer_dropdown = customtkinter.CTkOptionMenu(self, values=choices, variable=answer_var, command=update_answer)
+        answer_var = StringVar(value=self.question_data.get("answer", "").upper())
+        answer_dropdown = customtkinter.CTkOptionMenu(self, values=self.answer_letters(), variable=answer_var, command=update_answer)
         answer_dropdown.grid(row=(10+len(choices)), column=1, padx=4, sticky="ew")
 
-class QuizListFrame(customtkinter.CTkScrollableFrame):
-    def __init__(self, master, assessment_list, app, on_update=None, on_delete=None):
-        super().__init__(master)
+        def refresh_fields():
+            question_label.configure(text=f"QUESTION {self.question_index + 1}")
+            show_current_image()
+            caption_var.set(self.question_data.get("caption", ""))
+            attribution_var.set(self.question_data.get("attribution", ""))
+            question_var.set(self.question_data.get("question", ""))
+            for letter, var in self.choice_vars.items():
+                var.set(self.choice_text(letter))
+            answer_dropdown.configure(values=self.answer_letters())
+            answer_var.set(self.question_data.get("answer", "").upper())
+
+        self.refresh_fields = refresh_fields
+
+class QuizListFrame(VirtualListFrame):
+    """Virtualized list of QuizQuestionEditorFrames, one recycled editor per visible question"""
+    def __init__(self, master, assessment_list, app, path, on_update=None, on_delete=None):
+        super().__init__(master, assessment_list)
         self.app = app
         self.assessment_list = assessment_list
+        self.path = path
         self.on_update = on_update or (lambda: None)
         self.on_delete = on_delete or (lambda index: None)
-
-        # Manually bind mouse scroll wheel events (For Linux)
-        self.bind("<Button-4>", lambda _: self._parent_canvas.yview("scroll", -1, "units"))
-        self.bind("<Button-5>", lambda _: self._parent_canvas.yview("scroll", 1, "units"))
-
-        self.grid_columnconfigure(0, weight=1)
-        self.grid_rowconfigure(0, weight=1)
         self.render_questions()
 
     def render_questions(self):
-        for widget in self.winfo_children():
-            widget.destroy()
-
-        for i, question in enumerate(self.assessment_list):
-            # Question Fields
-            editor = QuizQuestionEditorFrame(self, i, question, self.app, on_update=self.on_update)
-            editor.grid(row=i, column=0, sticky="ew", padx=8, pady=(8, 0))
-
-            # Delete Buttons
-            delete_image = customtkinter.CTkImage(light_image=Image.open(self.app.resource_path("assets/icon_delete.png")))
-            delete_button = customtkinter.CTkButton(
-                self, 
-                image=delete_image, 
-                text="", 
-                command=lambda index=i: self.on_delete(index), 
-                width=20, 
-                fg_color="white", 
-                hover_color="gray", 
-                border_color="gray", 
-                border_width=2
-            )
-            delete_button.grid(row=i, column=1, padx=(0, 4))
+        self.refresh()
+
+    def create_row(self, master, index, question):
+        row = customtkinter.CTkFrame(master, fg_color="transparent")
+        row.grid_columnconfigure(0, weight=1)
+        row.index = index
+
+        # Question Fields
+        row.editor = QuizQuestionEditorFrame(row, index, question, self.path + [index], self.app, on_update=self.on_update)
+        row.editor.grid(row=0, column=0, sticky="ew", padx=8, pady=(8, 0))
+
+        # Delete Buttons
+        delete_image = self.app.assets.image(DELETE_ICON)
+        delete_button = customtkinter.CTkButton(
+            row, 
+            image=delete_image, 
+            text="", 
+            command=lambda: self.on_delete(row.index), 
+            width=20, 
+            fg_color="white", 
+            hover_color="gray", 
+            border_color="gray", 
+            border_width=2
+        )
+        delete_button.grid(row=0, column=1, padx=(0, 4))
+        return row
+
+    def bind_row(self, row, index, question):
+        row.index = index
+        row.editor.set_question(index, question, self.path + [index])
@@ -1,26 +1,65 @@
-import os
-import re
-import shutil
 import customtkinter
 from tkinter import StringVar, BooleanVar, filedialog
-from PIL import Image
+from core.model import find_path
+from core.ops import delete_op, insert_op, set_op
+from ui.assets import DELETE_ICON
+from ui.debounce import Debouncer
+from ui.thumbnails import clear_thumbnail, show_thumbnail
+from ui.virtual_list import VirtualListFrame
 
 class SectionEditorFrame(customtkinter.CTkFrame):
     """Frame to edit a specific section depending on its type."""
-    def __init__(self, master, section_data, app, on_update=None):
+    def __init__(self, master, section_data, path, app, on_update=None):
         super().__init__(master)
         self.app = app
         self.section_data = section_data
+        # Location of section_data in the module list, see core.ops
+        self.path = path
         self.on_update = on_update or (lambda: None)
 
+        # Set by the build_*_editor methods to reload their widgets from section_data
+        self.section_type = None
+        self.refresh_fields = None
+        # Debouncers of the current widgets, flushed before they are rebound or destroyed
+        self.debouncers = []
+
         self.grid_columnconfigure(0, weight=1)
         self.build_ui()
 
+    def set_section(self, section_data, path):
+        """Show another section, reusing the current widgets if it has the same type."""
+        self.flush_edits()
+        self.section_data = section_data
+        self.path = path
+        if self.refresh_fields and section_data.get("type", "content") == self.section_type:
+            self.refresh_fields()
+        else:
+            self.build_ui()
+
+    def flush_edits(self):
+        for debouncer in self.debouncers:
+            debouncer.flush()
+
+    def set_field(self, key, value):
+        self.app.set_value(self.path + [key], value)
+
+    def debounce(self, commit, *widgets):
+        """Commit edits in widgets through one Debouncer instead of on every keystroke."""
+        debouncer = Debouncer(self.app, commit)
+        for widget in widgets:
+            debouncer.watch(widget)
+        self.debouncers.append(debouncer)
+        return debouncer
+
     def build_ui(self):
+        self.flush_edits()
+        self.debouncers = []
         for widget in self.winfo_children():
             widget.destroy()
 
         section_type = self.section_data.get("type", "content")
+        self.section_type = section_type
+        self.refresh_fields = None
         if section_type == "text":
             self.build_text_editor("Text", 150, show_header=True)
         elif section_type == "list":
@@ -46,10 +85,10 @@ class SectionEditorFrame(customtkinter.CTkFrame):
             header_entry.grid(row=2, column=0, padx=4, sticky="ew")
 
             def update_header():
-                self.section_data["header"] = header_var.get()
+                self.set_field("header", header_var.get())
                 self.on_update()
 
-            header_entry.bind("<KeyRelease>", lambda _: update_header())
+            self.debounce(update_header, header_entry)
 
         # Text Content
         customtkinter.CTkLabel(self, text="Content").grid(row=3, column=0, sticky="w", padx=4, pady=(4, 0))
@@ -59,13 +98,23 @@ class SectionEditorFrame(customtkinter.CTkFrame):
         content_entry.grid(row=4, column=0, sticky="nsew", padx=4, pady=(0, 4))
 
         def update_content():
-            self.section_data["content"] = content_entry.get("1.0", "end-1c")
+            self.set_field("content", content_entry.get("1.0", "end-1c"))
             self.on_update()
         
-        content_entry.bind("<KeyRelease>", lambda _: update_content())
+        self.debounce(update_content, content_entry)
+
+        def refresh_fields():
+            if show_header:
+                header_var.set(self.section_data.get("header", ""))
+            content_entry.delete("1.0", "end")
+            content_entry.insert("1.0", self.section_data.get("content", ""))
+
+        self.refresh_fields = refresh_fields
 
     def build_list_editor(self):
         # Clear existing widgets before re-rendering
+        self.flush_edits()
+        self.debouncers = []
         for widget in self.winfo_children():
             widget.destroy()
             
@@ -75,22 +124,34 @@ class SectionEditorFrame(customtkinter.CTkFrame):
         categories = ["unordered", "ordered"]
         entry_list = self.section_data.get("entries", [""])
 
-        def add_entry():
-            entry_list.append("")
-            self.section_data["entries"] = entry_list
-            self.build_list_editor()
+        # Entry row frames, in entry order
+        entry_rows = []
 
-        def delete_entry(index):
-            del entry_list[index]
-            self.section_data["entries"] = entry_list
-            self.build_list_editor()
+        def entries_path():
+            # Sections without entries get the list shown in the editor on their first edit
+            if "entries" not in self.section_data:
+                self.set_field("entries", entry_list)
+            return self.path + ["entries"]
 
-        def update_category(choice):
-            self.section_data["category"] = choice
+        def add_entry():
+            self.app.apply([insert_op(entries_path() + [len(entry_list)], "")])
+            add_entry_row(len(entry_list) - 1, "")
+
+        def delete_entry(row):
+            row.debouncer.cancel()
+            self.debouncers.remove(row.debouncer)
+            index = row.index
+            self.app.apply([delete_op(entries_path() + [index])])
+            del entry_rows[index]
+            row.destroy()
+
+            # Only the rows below the removed one move up
+            for i in range(index, len(entry_rows)):
+                entry_rows[i].index = i
+                entry_rows[i].grid(row=3 + i)
 
-        def update_entry_text(index, text):
-            entry_list[index] = text
-            self.section_data["entries"] = entry_list
+        def update_category(choice):
+            self.set_field("category", choice)
 
         # Create a sub-frame for the dropdown and button
         button_row = customtkinter.CTkFrame(self, fg_color="transparent")
@@ -105,7 +166,7 @@ class SectionEditorFrame(customtkinter.CTkFrame):
         hasHeader_var = BooleanVar(value=self.section_data.get("hasHeader", False))
         
         def toggle_has_header():
-            self.section_data["hasHeader"] = hasHeader_var.get()
+            self.set_field("hasHeader", hasHeader_var.get())
         
         hasHeader_checkbox = customtkinter.CTkCheckBox(button_row, text="Has Header", variable=hasHeader_var, command=toggle_has_header)
         hasHeader_checkbox.grid(row=0, column=1, padx=8, sticky="w")
@@ -114,31 +175,33 @@ class SectionEditorFrame(customtkinter.CTkFrame):
         add_button = customtkinter.CTkButton(self, text="Add Entry", command=add_entry)
         add_button.grid(row=2, column=0, padx=8, sticky="w")
 
-        # Entries list
-        for index, value in enumerate(entry_list):
+        def add_entry_row(index, value):
             entry_frame = customtkinter.CTkFrame(self, fg_color="transparent")
             entry_frame.grid(row=3 + index, column=0, columnspan=2, pady=2, sticky="ew")
             entry_frame.grid_columnconfigure(0, weight=1)
             entry_frame.grid_columnconfigure(1, weight=0)
+            entry_frame.index = index
+            entry_rows.append(entry_frame)
 
             # Text entry for list item
             entry_content = customtkinter.CTkTextbox(entry_frame, wrap="word", height=80)
             entry_content.insert("1.0", value)
             entry_content.grid(row=0, column=0, padx=4, sticky="ew")
 
-            # Update on key release
-            def bind_textbox(widget, index):
-                def on_change(event):
-                    entry_value = widget.get("1.0", "end-1c")  # Remove trailing newline
-                    entry_list[index] = entry_value
-                    self.section_data["entries"] = entry_list
-                widget.bind("<KeyRelease>", on_change)
-            bind_textbox(entry_content, index)
-            
+            # Update once typing pauses
+            def on_change():
+                entry_value = entry_content.get("1.0", "end-1c")  # Remove trailing newline
+                self.app.set_value(entries_path() + [entry_frame.index], entry_value)
+            entry_frame.debouncer = self.debounce(on_change, entry_content)
+
             # Delete button
-            delete_button = customtkinter.CTkButton(entry_frame, text="Remove", width=60, command=lambda i=index: delete_entry(i))
+            delete_button = customtkinter.CTkButton(entry_frame, text="Remove", width=60, command=lambda: delete_entry(entry_frame))
             delete_button.grid(row=0, column=1, padx=4, sticky="e")
 
+        # Entries list
+        for index, value in enumerate(entry_list):
+            add_entry_row(index, value)
+
     def build_qna_editor(self):
         # Label
         customtkinter.CTkLabel(self, text="ACTIVE RECALL", text_color="green").grid(row=0, column=0, sticky="w", padx=4, pady=(4, 0))
@@ -156,12 +219,19 @@ class SectionEditorFrame(customtkinter.CTkFrame):
         answer_entry.grid(row=4, column=0, sticky="ew", padx=4, pady=(0, 4))
 
         def update_qna():
-            self.section_data["question"] = question_var.get()
-            self.section_data["answer"] = answer_var.get()
+            self.app.apply([
+                set_op(self.path + ["question"], question_var.get()),
+                set_op(self.path + ["answer"], answer_var.get()),
+            ])
             self.on_update()
 
-        question_entry.bind("<KeyRelease>", lambda _: update_qna())
-        answer_entry.bind("<KeyRelease>", lambda _: update_qna())
+        self.debounce(update_qna, question_entry, answer_entry)
+
+        def refresh_fields():
+            question_var.set(self.section_data.get("question", ""))
+            answer_var.set(self.section_data.get("answer", ""))
+
+        self.refresh_fields = refresh_fields
 
     def build_image_editor(self):
         # Label
@@ -176,35 +246,29 @@ class SectionEditorFrame(customtkinter.CTkFrame):
             file_path = filedialog.askopenfilename(filetypes=[("Image Files", "*.png *.jpg *.jpeg *.webp *.gif")])
             if not file_path:
                 return
+            section = self.section_data
+
+            def on_imported(name):
+                # Sections may have been moved or deleted meanwhile
+                path = find_path(self.app.modules, section)
+                if path is None:
+                    return
+                self.app.set_value(path + ["imgSrc"], name)
+                self.on_update()
+                # The editor may have been rebound to another section meanwhile
+                if self.winfo_exists() and self.section_data is section:
+                    show_thumbnail(self.app, self.preview_label, self.app.module_set.media_path(name))
 
-            media_dir = self.app.media_dir or os.path.join(self.app.temp_dir, "media")
-            os.makedirs(media_dir, exist_ok=True)
-            self.app.media_dir = media_dir
+            self.app.import_image(file_path, on_imported)
 
-            orig = os.path.basename(file_path)
-            name, ext = os.path.splitext(orig)
-            safe = re.sub(r'[^a-zA-Z0-9_-]', '_', name).lower()
-            dest = os.path.join(media_dir, safe + ext.lower())
-            shutil.copy(file_path, dest)
+        def show_current_image():
+            clear_thumbnail(self.preview_label)
+            if self.section_data.get("imgSrc"):
+                abs_path = self.app.module_set.media_path(self.section_data["imgSrc"])
+                if abs_path:
+                    show_thumbnail(self.app, self.preview_label, abs_path)
 
-            self.section_data["imgSrc"] = safe + ext.lower()
-            self.on_update()
-            load_preview(dest)
-
-        # Image preview
-        def load_preview(path):
-            try:
-                img = Image.open(path)
-                img.thumbnail((256,256))
-                self.tk_image = customtkinter.CTkImage(light_image=img, size=img.size)
-                self.preview_label.configure(image=self.tk_image, text="")
-            except Exception as e:
-                self.preview_label.configure(text=f"Error loading image:\n{e}", image="")
-
-        if self.section_data.get("imgSrc"):
-            abs_path = os.path.join(self.app.temp_dir, "media", self.section_data["imgSrc"])
-            if os.path.exists(abs_path):
-                load_preview(abs_path)
+        show_current_image()
 
         # Upload Image button
         customtkinter.CTkButton(self, text="Upload Image", command=choose_image).grid(row=2, column=0)
@@ -222,53 +286,62 @@ class SectionEditorFrame(customtkinter.CTkFrame):
         attribution_entry.grid(row=6, column=0, sticky="ew", padx=4, pady=(0, 4))
 
         def update_caption():
-            self.section_data["caption"] = caption_var.get()
+            self.set_field("caption", caption_var.get())
             self.on_update()
 
         def update_attribution():
-            self.section_data["attribution"] = attribution_var.get()
+            self.set_field("attribution", attribution_var.get())
             self.on_update()
 
-        caption_entry.bind("<KeyRelease>", lambda _: update_caption())
-        attribution_entry.bind("<KeyRelease>", lambda _: update_attribution())
+        self.debounce(update_caption, caption_entry)
+        self.debounce(update_attribution, attribution_entry)
 
-class SectionListFrame(customtkinter.CTkScrollableFrame):
-    """Scrollable container of SectionEditorFrames"""
-    def __init__(self, master, section_list, app, on_update=None, on_delete=None):
-        super().__init__(master)
+        def refresh_fields():
+            show_current_image()
+            caption_var.set(self.section_data.get("caption", ""))
+            attribution_var.set(self.section_data.get("attribution", ""))
+
+        self.refresh_fields = refresh_fields
+
+class SectionListFrame(VirtualListFrame):
+    """Virtualized list of SectionEditorFrames, one recycled editor per visible section"""
+    def __init__(self, master, section_list, app, path, on_update=None, on_delete=None):
+        super().__init__(master, section_list)
         self.app = app
         self.section_list = section_list
+        self.path = path
         self.on_update = on_update or (lambda: None)
         self.on_delete = on_delete or (lambda index: None)
-
-        # Manually bind mouse scroll wheel events (For Linux)
-        self.bind("<Button-4>", lambda _: self._parent_canvas.yview("scroll", -1, "units"))
-        self.bind("<Button-5>", lambda _: self._parent_canvas.yview("scroll", 1, "units"))
-
-        self.grid_columnconfigure(0, weight=1)
-        self.grid_rowconfigure(0, weight=1)
         self.render_sections()
 
     def render_sections(self):
-        for widget in self.winfo_children():
-            widget.destroy()
-
-        for i, section in enumerate(self.section_list):
-            # Editor Fields
-            editor = SectionEditorFrame(self, section, self.app, on_update=self.on_update)
-            editor.grid(row=i, column=0, sticky="ew", pady=(4, 0), padx=16)
-
-            # Delete Buttons
-            delete_image = customtkinter.CTkImage(light_image=Image.open(self.app.resource_path("assets/icon_delete.png")))
-            delete_button = customtkinter.CTkButton(
-                self, 
-                image=delete_image, 
-                text="", 
-                command=lambda index=i: self.on_delete(index), 
-                width=20, 
-                fg_color="white", 
-                hover_color="gray", 
-                border_color="gray", 
-                border_width=2
-            )
-            delete_button.grid(row=i, column=1, padx=(0, 4))
+        self.refresh()
+
+    def create_row(self, master, index, section):
+        row = customtkinter.CTkFrame(master, fg_color="transparent")
+        row.grid_columnconfigure(0, weight=1)
+        row.index = index
+
+        # Editor Fields
+        row.editor = SectionEditorFrame(row, section, self.path + [index], self.app, on_update=self.on_update)
+        row.editor.grid(row=0, column=0, sticky="ew", pady=(4, 0), padx=16)
+
+        # Delete Buttons
+        delete_image = self.app.assets.image(DELETE_ICON)
+        delete_button = customtkinter.CTkButton(
+            row, 
+            image=delete_image, 
+            text="", 
+            command=lambda: self.on_delete(row.index), 
+            width=20, 
+            fg_color="white", 
+            hover_color="gray", 
+            border_color="gray", 
+            border_width=2
+        )
+        delete_button.grid(row=0, column=1, padx=(0, 4))
+        return row
+
+    def bind_row(self, row, index, section):
+        row.index = index
+        row.editor.set_section(section, self.path + [index])
@@ -1,13 +1,20 @@
 import customtkinter
 import tkinter.ttk as ttk
+from core.search import record_text, snippet
+
+def is_list_item(path):
+    """Whether a hit path is a section or a quiz question rather than a module or topic."""
+    return len(path) == 5 or len(path) == 3 and path[1] == "assessment"
 
 class SidebarFrame(customtkinter.CTkFrame):
+    MAX_RESULTS = 100
+
     def __init__(self, master, app):
         super().__init__(master)
         self.app = app
 
         self.grid_columnconfigure(0, weight=1)
-        self.grid_rowconfigure(2, weight=1)
+        self.grid_rowconfigure(3, weight=1)
 
         self.label = customtkinter.CTkLabel(self, text="Modules")
         self.label.grid(row=0, column=0, sticky="ew")
@@ -15,9 +22,18 @@ class SidebarFrame(customtkinter.CTkFrame):
         self.add_button = customtkinter.CTkButton(self, text="Add Module", command=self.app.add_module)
         self.add_button.grid(row=1, column=0, pady=(0, 8))
 
+        # Search box; while it holds a query the results list replaces the tree
+        self.search_entry = customtkinter.CTkEntry(self, placeholder_text="Search")
+        self.search_entry.grid(row=2, column=0, padx=10, pady=(0, 8), sticky="ew")
+        self.search_entry.bind("<KeyRelease>", self.on_search_key)
+        self.search_entry.bind("<Return>", self.on_search_return)
+        self.search_entry.bind("<Escape>", self.on_search_escape)
+        # Query the results list shows
+        self.query = ""
+
         # Subframe for treeview
         tree_container = customtkinter.CTkFrame(self)
-        tree_container.grid(row=2, column=0, padx=10, pady=(0, 10), sticky="nsew")
+        tree_container.grid(row=3, column=0, padx=10, pady=(0, 10), sticky="nsew")
         tree_container.grid_rowconfigure(0, weight=1)
         tree_container.grid_columnconfigure(0, weight=1)
 
@@ -26,24 +42,223 @@ class SidebarFrame(customtkinter.CTkFrame):
         self.module_tree.grid(row=0, column=0, sticky="nsew")
         self.module_tree.bind("<<TreeviewSelect>>", self.on_select)
 
+        # Search results, as Treeview item -> core.search.Hit
+        self.results_tree = ttk.Treeview(tree_container, show="tree")
+        self.results_tree.bind("<<TreeviewSelect>>", self.on_result_select)
+        self.results = {}
+
         # Scrollbar for the Treeview
-        scrollbar = customtkinter.CTkScrollbar(tree_container, command=self.module_tree.yview)
-        scrollbar.grid(row=0, column=1, sticky="ns")
-        self.module_tree.configure(yscrollcommand=scrollbar.set)
+        self.scrollbar = customtkinter.CTkScrollbar(tree_container)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.show_tree(self.module_tree)
+
+        # uid of a module or topic -> Treeview item, and item -> module or topic.
+        # Quiz items have the quiz tag and belong to their parent's module.
+        self.item_ids = {}
+        self.items = {}
+
+    def rebuild(self, modules):
+        """Replace the whole tree. Use the targeted methods below for single changes."""
+        self.module_tree.delete(*self.module_tree.get_children())
+        self.item_ids.clear()
+        self.items.clear()
+        for module in modules:
+            self.insert_module(module)
+        if self.query:
+            self.show_results()
+
+    def add_item(self, obj, parent, index, text, **kwargs):
+        item = self.module_tree.insert(parent, index, text=text, **kwargs)
+        if obj is not None:
+            self.item_ids[obj.uid] = item
+            self.items[item] = obj
+        return item
+
+    def insert_module(self, module, index="end"):
+        module_id = self.add_item(module, "", index, module["title"], open=True)
+
+        # Load Topics
+        for topic in module.get("topics", []):
+            self.add_item(topic, module_id, "end", topic["title"])
+
+        # Load Quiz
+        if "assessment" in module:
+            self.add_item(None, module_id, "end", "Quiz", tags=("quiz"))
+
+    def insert_topic(self, module, topic_index):
+        """Add the node for module["topics"][topic_index]; topics come before the quiz."""
+        topic = module["topics"][topic_index]
+        self.add_item(topic, self.item_ids[module.uid], topic_index, topic["title"])
+
+    def insert_quiz(self, module):
+        self.add_item(None, self.item_ids[module.uid], "end", "Quiz", tags=("quiz"))
+
+    def rename(self, obj, text):
+        self.module_tree.item(self.item_ids[obj.uid], text=text)
+
+    def quiz_item(self, module_item):
+        for child in self.module_tree.get_children(module_item):
+            if "quiz" in self.module_tree.item(child, "tags"):
+                return child
+        return None
+
+    def remove(self, item):
+        """Delete a node and its children."""
+        self.forget(item)
+        self.module_tree.delete(item)
+
+    def forget(self, item):
+        for child in self.module_tree.get_children(item):
+            self.forget(child)
+        obj = self.items.pop(item, None)
+        if obj is not None:
+            del self.item_ids[obj.uid]
+
+    def sync(self, ops):
+        """Update the tree for ops that were just applied to the modules, see core.ops.
+
+        Only the nodes the ops touch are changed, so this costs the same
+        however many modules there are.
+        """
+        modules = self.app.modules
+        for kind, path, _ in ops:
+            if len(path) == 1:
+                if kind == "insert":
+                    self.insert_module(modules[path[0]], path[0])
+                elif kind == "delete":
+                    self.remove(self.module_tree.get_children("")[path[0]])
+                continue
+
+            module = modules[path[0]]
+            module_item = self.item_ids[module.uid]
+            if path[1:] == ["title"]:
+                self.rename(module, module["title"])
+            elif path[1:] == ["assessment"]:
+                item = self.quiz_item(module_item)
+                if item is not None:
+                    self.remove(item)
+                if "assessment" in module:
+                    self.insert_quiz(module)
+            elif len(path) == 3 and path[1] == "topics":
+                if kind == "insert":
+                    self.insert_topic(module, path[2])
+                elif kind == "delete":
+                    self.remove(self.module_tree.get_children(module_item)[path[2]])
+            elif len(path) == 4 and path[1] == "topics" and path[3] == "title":
+                topic = module["topics"][path[2]]
+                self.rename(topic, topic["title"])
+        # Result paths and texts may have changed
+        if self.query:
+            self.show_results()
 
     def on_select(self, event):
         item = self.module_tree.focus()
+        if not item:
+            return
         parent = self.module_tree.parent(item)
+        modules = self.app.modules
 
+        # Items are resolved through the model objects they show, not their tree position
+        main_frame = self.app.main_frame
         if not parent:
-            index = self.module_tree.index(item)
-            self.app.main_frame.show_module_editor(index)
+            self.show_editor(main_frame.show_module_editor, modules.index(self.items[item]))
+            return
+
+        module = self.items[parent]
+        module_index = modules.index(module)
+        if "quiz" in self.module_tree.item(item, "tags"):
+            self.show_editor(main_frame.show_quiz_editor, module_index)
+        else:
+            self.show_editor(main_frame.show_topic_editor, module_index, module["topics"].index(self.items[item]))
+
+    def show_editor(self, show, *args):
+        # Selecting the node of the editor already shown, as show_hit() does, leaves it as it is
+        if self.app.main_frame.view != (show, args):
+            show(*args)
+
+    def show_tree(self, tree):
+        """Show the module tree or the results list in the tree's place."""
+        other = self.results_tree if tree is self.module_tree else self.module_tree
+        other.grid_remove()
+        tree.grid(row=0, column=0, sticky="nsew")
+        tree.configure(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.configure(command=tree.yview)
+
+    def show_results(self):
+        """Fill the results list for the query typed, or go back to the tree without one."""
+        query = self.query = self.search_entry.get().strip()
+        self.results_tree.delete(*self.results_tree.get_children())
+        self.results.clear()
+        if not query:
+            self.show_tree(self.module_tree)
+            return
+        if not self.app.search_index.is_ready():
+            # App.build_search_index() shows the results once the index is built
+            self.results_tree.insert("", "end", text="Indexing…")
+            self.show_tree(self.results_tree)
+            return
+
+        hits = self.app.search_index.search(query, limit=self.MAX_RESULTS)
+        for hit in hits:
+            item = self.results_tree.insert("", "end", text=self.hit_label(hit, query))
+            self.results[item] = hit
+        if not hits:
+            self.results_tree.insert("", "end", text="No matches")
+        elif len(hits) == self.MAX_RESULTS:
+            self.results_tree.insert("", "end", text=f"Showing the first {self.MAX_RESULTS} matches")
+        self.show_tree(self.results_tree)
+
+    def hit_label(self, hit, query):
+        path = hit.path
+        module = self.app.modules[path[0]]
+        parts = [module["title"]]
+        if len(path) > 1 and path[1] == "topics":
+            parts.append(module["topics"][path[2]]["title"])
+            if len(path) > 3:
+                parts.append(f"Section {path[4] + 1}")
+        elif len(path) > 1:
+            parts.append(f"Quiz question {path[2] + 1}")
+        label = " › ".join(parts)
+        if is_list_item(path):
+            label += ": " + snippet(record_text(hit.record), query)
+        return label
+
+    def on_search_key(self, _event):
+        if self.search_entry.get().strip() != self.query:
+            self.show_results()
+
+    def on_search_escape(self, _event):
+        self.search_entry.delete(0, "end")
+        self.show_results()
+
+    def on_search_return(self, _event):
+        children = self.results_tree.get_children()
+        if children and children[0] in self.results:
+            self.show_hit(self.results[children[0]])
+
+    def on_result_select(self, _event):
+        hit = self.results.get(self.results_tree.focus())
+        if hit is not None:
+            self.show_hit(hit)
+
+    def show_hit(self, hit):
+        """Open the editor holding a search hit, scrolled to it, and select its node in the tree."""
+        path = hit.path
+        module = self.app.modules[path[0]]
+        main_frame = self.app.main_frame
+        if len(path) == 1:
+            self.show_editor(main_frame.show_module_editor, path[0])
+            item = self.item_ids[module.uid]
+        elif path[1] == "topics":
+            self.show_editor(main_frame.show_topic_editor, path[0], path[2])
+            item = self.item_ids[module["topics"][path[2]].uid]
         else:
-            module_index = self.module_tree.index(parent)
-            item_text = self.module_tree.item(item, "text")
-
-            if item_text == "Quiz":
-                self.app.main_frame.show_quiz_editor(module_index)
-            else:
-                topic_index = self.module_tree.index(item)
-                self.app.main_frame.show_topic_editor(module_index, topic_index)
+            self.show_editor(main_frame.show_quiz_editor, path[0])
+            item = self.quiz_item(self.item_ids[module.uid])
+        # Sections and questions are scrolled to the top of their list
+        if is_list_item(path) and main_frame.list_frame is not None:
+            main_frame.list_frame.scroll_to(path[-1])
+
+        self.module_tree.focus(item)
+        self.module_tree.selection_set(item)
+        self.module_tree.see(item)
@@ -0,0 +1,44 @@
+import sys
+import time
+
+class StartupProfile:
+    """Opt-in report of how long each phase of the GUI's cold start takes.
+
+    Enabled with --profile-startup on the command line, or
+    --profile-startup=exit to close the window again once it is up, for
+    benchmarks/bench_startup.py. Each phase lasts from the previous mark; the
+    first from when this module was imported, which is the first thing
+    modulearn-maker.py does.
+    """
+    FLAG = "--profile-startup"
+
+    def __init__(self, enabled=False, exit_after=False):
+        self.enabled = enabled
+        self.exit_after = exit_after
+        self.start = self.last = time.perf_counter()
+        self.phases = []
+
+    @classmethod
+    def from_argv(cls, argv):
+        for arg in argv:
+            if arg == cls.FLAG:
+                return cls(enabled=True)
+            if arg == f"{cls.FLAG}=exit":
+                return cls(enabled=True, exit_after=True)
+        return cls()
+
+    def mark(self, phase):
+        """End the current phase and name it."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self, file=sys.stderr):
+        if not self.enabled:
+            return
+        print("Startup profile:", file=file)
+        for phase, elapsed in self.phases:
+            print(f"  {phase:<24} {elapsed * 1000:8.1f} ms", file=file)
+        print(f"  {'time to window':<24} {(self.last - self.start) * 1000:8.1f} ms", file=file)
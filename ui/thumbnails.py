@@ -0,0 +1,200 @@
+import os
+import queue
+import hashlib
+from collections import OrderedDict
+
+import customtkinter
+
+THUMBNAIL_SIZE = (256, 256)
+
+def default_disk_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "modulearn-maker", "thumbnails")
+
+class ThumbnailRequest:
+    """A pending asynchronous thumbnail load, see ThumbnailCache.request()."""
+    def __init__(self, key, callback):
+        self.key = key
+        self.callback = callback
+        self.future = None
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+class ThumbnailCache:
+    """Preview thumbnails of media files, decoded at most once.
+
+    Decoded thumbnails are kept in a bounded LRU keyed by (path, mtime, size).
+    When disk_dir is set, thumbnails are also stored there as PNG files named
+    after a hash of the source file's content, so they survive eviction and
+    later sessions, whose working directories have different paths.
+
+    Cache misses are decoded on a small thread pool; results are handed back on
+    the Tk thread by polling with root.after(), which is also the only thread
+    that touches the LRU.
+    """
+    POLL_MS = 30
+
+    def __init__(self, root, max_items=128, disk_dir=None, size=THUMBNAIL_SIZE, workers=2):
+        self.root = root
+        self.max_items = max_items
+        self.disk_dir = disk_dir
+        self.size = size
+        self.memory = OrderedDict()
+
+        # Started on the first request, so that startup does not import concurrent.futures and PIL
+        self.workers = workers
+        self.executor = None
+        self.finished = queue.Queue()
+        self.pending = set()
+        self.polling = False
+
+    def key(self, path):
+        st = os.stat(path)
+        return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+    def remember(self, key, thumbnail):
+        self.memory[key] = thumbnail
+        if len(self.memory) > self.max_items:
+            self.memory.popitem(last=False)
+
+    def request(self, path, callback):
+        """Call callback(thumbnail, error) on the Tk thread once path is decoded.
+
+        Cached thumbnails are delivered immediately and None is returned;
+        otherwise the returned ThumbnailRequest can be cancelled.
+        """
+        key = self.key(path)
+        thumbnail = self.memory.get(key)
+        if thumbnail is not None:
+            self.memory.move_to_end(key)
+            callback(thumbnail, None)
+            return None
+
+        if self.executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="thumbnail")
+        request = ThumbnailRequest(key, callback)
+        request.future = self.executor.submit(self.load, path)
+        request.future.add_done_callback(lambda _: self.finished.put(request))
+        self.pending.add(request)
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.POLL_MS, self.poll)
+        return request
+
+    def cancel_pending(self):
+        """Cancel every request that has not been delivered yet."""
+        for request in self.pending:
+            request.cancel()
+
+    def poll(self):
+        while True:
+            try:
+                request = self.finished.get_nowait()
+            except queue.Empty:
+                break
+
+            self.pending.discard(request)
+            if request.cancelled or request.future.cancelled():
+                continue
+            error = request.future.exception()
+            if error is None:
+                thumbnail = request.future.result()
+                self.remember(request.key, thumbnail)
+                request.callback(thumbnail, None)
+            else:
+                request.callback(None, error)
+
+        if self.pending:
+            self.root.after(self.POLL_MS, self.poll)
+        else:
+            self.polling = False
+
+    def load(self, path):
+        """Read a thumbnail from the disk tier or decode it. Runs on worker threads."""
+        thumbnail = self.load_from_disk(path)
+        if thumbnail is None:
+            thumbnail = self.decode(path)
+            self.store_on_disk(path, thumbnail)
+        return thumbnail
+
+    def decode(self, path):
+        from PIL import Image
+        with Image.open(path) as img:
+            # Lets JPEG decode at a reduced scale instead of at full resolution
+            img.draft("RGB", self.size)
+            img.thumbnail(self.size)
+            img.load()
+            return img.copy()
+
+    def disk_path(self, path):
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return os.path.join(self.disk_dir, f"{digest.hexdigest()}_{self.size[0]}x{self.size[1]}.png")
+
+    def load_from_disk(self, path):
+        if not self.disk_dir:
+            return None
+        from PIL import Image
+        try:
+            with Image.open(self.disk_path(path)) as img:
+                img.load()
+                return img.copy()
+        except OSError:
+            return None
+
+    def store_on_disk(self, path, thumbnail):
+        if not self.disk_dir:
+            return
+        # The disk tier is only an optimisation, so failures are ignored
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            target = self.disk_path(path)
+            partial = f"{target}.{os.getpid()}.partial"
+            thumbnail.save(partial, format="PNG")
+            os.replace(partial, target)
+        except OSError:
+            pass
+
+    def shutdown(self):
+        self.cancel_pending()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+def clear_thumbnail(label, text="No image selected"):
+    """Show text instead of an image, cancelling any thumbnail still loading for label."""
+    previous = getattr(label, "thumbnail_request", None)
+    if previous is not None:
+        previous.cancel()
+    label.thumbnail_request = None
+    label.configure(text=text, image="")
+
+def show_thumbnail(app, label, path):
+    """Show a placeholder in label and swap in the thumbnail of path once decoded.
+
+    A newer request for the same label cancels the older one, and results for
+    labels destroyed in the meantime are dropped.
+    """
+    clear_thumbnail(label, "Loading preview...")
+
+    def on_ready(img, error):
+        if not label.winfo_exists():
+            return
+        label.thumbnail_request = None
+        if error is not None:
+            label.configure(text=f"Error loading image:\n{error}", image="")
+            return
+        # The label keeps the reference the image needs to stay visible
+        label.thumbnail_image = customtkinter.CTkImage(light_image=img, size=img.size)
+        label.configure(image=label.thumbnail_image, text="")
+
+    try:
+        label.thumbnail_request = app.thumbnails.request(path, on_ready)
+    except Exception as e:
+        label.configure(text=f"Error loading image:\n{e}", image="")
@@ -0,0 +1,226 @@
+import tkinter
+import customtkinter
+
+class VirtualListFrame(customtkinter.CTkFrame):
+    """Scrollable list that only builds widgets for the items in view.
+
+    Rows are stacked in a frame inside a canvas, which clips them to the
+    viewport. Only as many row widgets as it takes to cover the viewport are
+    created, and they are rebound to whichever items come into view, so
+    building and scrolling cost the same for 10 items as for 10,000.
+
+    The view is the first item shown plus how many pixels of it are scrolled
+    past, so an item taller than the viewport can still be scrolled through.
+    The scrollbar spans item indices rather than pixels, since the heights of
+    items that were never shown are unknown.
+
+    Subclasses implement create_row(master, index, item) and
+    bind_row(row, index, item).
+    """
+    # Pixels per mouse wheel notch or scrollbar arrow click
+    SCROLL_STEP = 40
+
+    def __init__(self, master, items):
+        super().__init__(master)
+        self.items = items
+        self.first = 0
+        self.offset = 0
+        # Every row widget, and the ones in view in item order with their heights
+        self.rows = []
+        self.visible_rows = []
+        self.heights = []
+        self.layout_pending = False
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        background = self._apply_appearance_mode(self.cget("fg_color"))
+        self.canvas = tkinter.Canvas(self, width=200, height=200, bg=background, highlightthickness=0, borderwidth=0)
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        self.canvas.bind("<Configure>", self.on_resize)
+
+        self.body = customtkinter.CTkFrame(self.canvas, fg_color="transparent")
+        self.body.grid_columnconfigure(0, weight=1)
+        self.window = self.canvas.create_window(0, 0, window=self.body, anchor="nw")
+        # Rows grow and shrink as they are edited, e.g. when an image loads
+        tkinter.Misc.bind(self.body, "<Configure>", lambda _: self.schedule_layout())
+
+        self.scrollbar = customtkinter.CTkScrollbar(self, command=self.on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.bind_wheel(self)
+
+    def create_row(self, master, index, item):
+        raise NotImplementedError
+
+    def bind_row(self, row, index, item):
+        raise NotImplementedError
+
+    def viewport_height(self):
+        # 1 until the canvas is mapped; on_resize fills the real viewport then
+        return max(1, self.canvas.winfo_height())
+
+    def refresh(self, changed_from=0):
+        """Bind rows to the items in view.
+
+        Rows showing items before changed_from are assumed unchanged and are
+        only moved, not rebound.
+        """
+        count = len(self.items)
+        self.first = max(0, min(self.first, count - 1))
+        if self.first == 0:
+            self.offset = max(0, self.offset)
+        bottom = self.fill(changed_from)
+        changed_from = count
+
+        # Scrolled past the end: move up until the last item ends at the bottom of the viewport
+        gap = self.viewport_height() - bottom
+        if gap > 0 and (self.first > 0 or self.offset > 0):
+            taken = min(self.offset, gap)
+            self.offset -= taken
+            gap -= taken
+            while gap > 0 and self.first > 0:
+                self.first -= 1
+                self.offset = 0
+                self.fill(changed_from)
+                height = self.heights[0]
+                self.offset = max(0, height - gap)
+                gap -= height
+            self.fill(changed_from)
+
+        self.canvas.coords(self.window, 0, -self.offset)
+        self.update_scrollbar()
+
+    def fill(self, changed_from=0):
+        """Bind rows to the items from first on until they cover the viewport.
+
+        Returns where the last row ends, relative to the top of the viewport.
+        """
+        # Rows still showing an unchanged item keep it; the rest are free to rebind
+        bound = {}
+        spare = []
+        for row in self.rows:
+            if row.item_index is not None and row.item_index < changed_from:
+                bound[row.item_index] = row
+            else:
+                spare.append(row)
+
+        viewport = self.viewport_height()
+        visible_rows = []
+        heights = []
+        bottom = -self.offset
+        index = self.first
+        while index < len(self.items) and bottom < viewport:
+            row = bound.pop(index, None)
+            if row is None:
+                if not spare and bound:
+                    # A row above the view, or else the one furthest below it
+                    above = [i for i in bound if i < self.first]
+                    spare.append(bound.pop(above[0] if above else max(bound)))
+                if spare:
+                    row = spare.pop()
+                    self.bind_row(row, index, self.items[index])
+                else:
+                    row = self.create_row(self.body, index, self.items[index])
+                    self.rows.append(row)
+                row.item_index = index
+                self.bind_wheel(row)
+            row.grid(row=len(visible_rows), column=0, sticky="ew")
+            row.update_idletasks()
+            heights.append(row.winfo_reqheight())
+            visible_rows.append(row)
+            bottom += heights[-1]
+            index += 1
+
+        for row in spare + list(bound.values()):
+            if row.item_index is not None:
+                row.grid_remove()
+                row.item_index = None
+        self.visible_rows = visible_rows
+        self.heights = heights
+        return bottom
+
+    def update_scrollbar(self):
+        count = len(self.items)
+        if not count or not self.heights:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        start = self.first + self.offset / max(1, self.heights[0])
+        # The last row may reach below the viewport
+        below = sum(self.heights) - self.offset - self.viewport_height()
+        end = self.first + len(self.heights) - max(0, below) / max(1, self.heights[-1])
+        self.scrollbar.set(start / count, min(1.0, end / count))
+
+    def schedule_layout(self):
+        if not self.layout_pending:
+            self.layout_pending = True
+            self.after_idle(self.layout)
+
+    def layout(self):
+        """Cover the viewport again after it or the rows in it changed size."""
+        self.layout_pending = False
+        if self.winfo_exists():
+            self.refresh(changed_from=len(self.items))
+
+    def on_resize(self, event):
+        self.canvas.itemconfigure(self.window, width=event.width)
+        self.schedule_layout()
+
+    def item_inserted(self, index):
+        """Show an item just inserted at index, rebinding only the rows from there on."""
+        self.refresh(changed_from=index)
+        if index not in (row.item_index for row in self.visible_rows):
+            self.scroll_to(index)
+
+    def item_removed(self, index):
+        """Update the view after the item at index was removed."""
+        self.refresh(changed_from=index)
+
+    def scroll_to(self, index, offset=0):
+        """Move the view so that index is the first item, scrolled offset pixels into it."""
+        self.first = index
+        self.offset = offset
+        self.refresh(changed_from=len(self.items))
+
+    def scroll_by(self, pixels):
+        """Scroll the view by pixels, down if positive."""
+        first = self.first
+        offset = self.offset + pixels
+        # Down past the rows in view, whose heights are known
+        for height in self.heights:
+            if offset < height or first == len(self.items) - 1:
+                break
+            offset -= height
+            first += 1
+        # Up into items above the view, which have to be shown to be measured
+        while offset < 0 and first > 0:
+            first -= 1
+            self.scroll_to(first)
+            offset += self.heights[0] if self.heights else 0
+        self.scroll_to(first, max(0, offset))
+
+    def on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            position = max(0.0, float(value)) * len(self.items)
+            index = min(int(position), max(0, len(self.items) - 1))
+            self.scroll_to(index)
+            if self.heights:
+                self.scroll_to(index, int((position - index) * self.heights[0]))
+        elif action == "scroll":
+            step = self.viewport_height() * 9 // 10 if unit == "pages" else self.SCROLL_STEP
+            self.scroll_by(int(value) * step)
+
+    def on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.scroll_by(-self.SCROLL_STEP)
+        elif event.num == 5 or event.delta < 0:
+            self.scroll_by(self.SCROLL_STEP)
+
+    def bind_wheel(self, widget):
+        """Scroll the list from anywhere over widget and its children."""
+        # CTk widgets override bind() to always add, so bind on the plain Tk
+        # widgets directly; rebinding then replaces instead of piling up handlers
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            tkinter.Misc.bind(widget, sequence, self.on_wheel)
+        for child in widget.winfo_children():
+            self.bind_wheel(child)